@@ -1,45 +1,171 @@
 #app.py
+import asyncio
 import faicons as fa
 import pandas as pd
-from shiny import App, Inputs, Outputs, Session, render, ui, reactive
+from concurrent.futures import ThreadPoolExecutor
+from shiny import App, Inputs, Outputs, Session, render, ui, reactive, req
 from shinywidgets import output_widget, render_widget
 from config import *
 from utilities import *
+from rollup import load_rollup_cube, query_rollup_cube, data_files
+from result_cache import process_data_cache, figure_cache
+from partition_index import PartitionIndex
+from warehouse import open_warehouse
+from ingest import ingest_directory, replay_processed
+from outage_detector import OutageDetector, lga_outages
+from uptime_sketch import build_uptime_sketches, query_uptime_sketches, uptime_distribution
+from snapshot import load_snapshot, derive_startup_state, LazyLoad
+from assets import AssetStore
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+from metrics import stage_metrics, metrics_endpoint
 
 #local_env = os.getenv("LOCAL_ENV", "True").lower() == "true"
-# Load data and compute static values
-months_data, lga_geogcoord_dict, poa_suburb, geodf_filter_lga, geodf_filter_poa = load_and_prepare_data(local_env = True) # load_and_prepare_data(local_env=local_env)
+# partitioned Parquet queried out of core, None until built with warehouse.py
+warehouse = open_warehouse()
+# start-up state prebuilt by snapshot.py, None when missing or stale
+startup_state = load_snapshot(warehouse = warehouse)
+months_data = None
+if startup_state is None:
+    # Load data and compute static values, only the site list when the warehouse holds the observations
+    months_data, lga_geogcoord_dict, poa_suburb, geodf_filter_lga, geodf_filter_poa = load_and_prepare_data(local_env = True, warehouse = warehouse) # load_and_prepare_data(local_env=local_env)
+    startup_state = derive_startup_state(months_data, lga_geogcoord_dict, poa_suburb, geodf_filter_lga, geodf_filter_poa)
+# LGA centres, postcode suburbs and the postcode polygons pre-sliced and simplified per LGA for the map
+lga_geogcoord_dict = startup_state['lga_geogcoord_dict']
+poa_suburb = startup_state['poa_suburb']
+geometry_service = startup_state['geometry_service']
+# pre-aggregated rollup cube, None until built with rollup.py or when older than the data
+rollup_cube = LazyLoad(lambda: load_rollup_cube(sources = data_files + (warehouse.files() if warehouse is not None else [])))
+# CPO logos, read once
+asset_store = AssetStore([style['icon'] for style in cpo_styles.values()])
+
+def load_observations(months_data = None):
+    """
+    Indexes the observations, loading them first when the app started from a snapshot.
+    Runs the outage detector over the history, sketches the per-charger uptime,
+    replays the files ingested before a restart and ingests files received before the load.
+
+    Returns:
+        tuple: (PartitionIndex, OutageDetector, uptime sketches)
+    """
+    if months_data is None:
+        months_data = load_and_prepare_data(local_env = True)[0]
+    # index the data by LGA and interval, the sorted copy replaces the loaded frame
+    partition_index = PartitionIndex(months_data)
+    # sustained outages in the loaded history, extended as new intervals are ingested
+    outage_detector = OutageDetector()
+    outage_detector.update(partition_index.data)
+    # per-charger daily uptime histograms per LGA and month, merged for any selection
+    uptime_sketches = build_uptime_sketches(partition_index)
+    # files ingested before a restart are only in processed/, the loaded data does not hold them
+    replay_processed(ingest_dir, partition_index, rollup_cube.get(), outage_detector=outage_detector, uptime_sketches=uptime_sketches)
+    ingest_directory(ingest_dir, partition_index, rollup_cube.get(), outage_detector=outage_detector, uptime_sketches=uptime_sketches)
+    return partition_index, outage_detector, uptime_sketches
+
+# observations held in memory, loaded on the first query; the warehouse is queried instead once built
+observations = LazyLoad(load_observations) if warehouse is None else None
+if observations is not None and months_data is not None:
+    # already read without a snapshot
+    observations.set(load_observations(months_data))
+del months_data
+
+# New observation files dropped into ingest_dir are appended while the app runs.
+# Shared by all sessions; the returned version changes whenever data is ingested.
+@reactive.poll(lambda: sorted(path.name for path in ingest_dir.glob('*.*')), interval_secs=ingest_poll_secs)
+def data_version():
+    # files received before the observations are loaded are ingested with them
+    if observations is not None and observations.loaded:
+        partition_index, outage_detector, uptime_sketches = observations.get()
+        ingest_directory(ingest_dir, partition_index, rollup_cube.get(), outage_detector=outage_detector, uptime_sketches=uptime_sketches)
+    elif warehouse is not None and ingest_directory(ingest_dir, warehouse):
+        # the cube cannot be rebuilt from the warehouse, queries fall back to the warehouse until rollup.py is rerun
+        rollup_cube.set(None)
+    return process_data_cache.data_version
+
+# Thread pool for the heavy aggregation, shared by every session on the worker
+compute_executor = ThreadPoolExecutor(max_workers=compute_workers, thread_name_prefix="compute")
+
+def aggregate_selection(lga_name, cpo_selected, start_date, end_date, interval_option):
+    """
+    Aggregates the selection for the CPO, location and postcode levels.
+    Runs in compute_executor, results are shared across sessions through the process-wide cache.
+
+    Returns:
+        list | None: [cpo_data, location_data, postcode_data, cpo_kpi_data, cpo_uptime_histograms], or None when there is no data.
+            The histograms are None when the warehouse holds the observations.
+    """
+    # aggregate lists for cpo_data, location and postcode
+    agg_lists = [agg_levels['cpo'], agg_levels['site'], agg_levels['postcode']]
+    def aggregate():
+        # the first query loads the observations, which ingests received files into the cube before it is read
+        loaded = observations.get() if observations is not None else None
+        cube = rollup_cube.get()
+        if cube is not None:
+            # roll up from the pre-aggregated cube
+            with stage_metrics.timer('compute.rollup'):
+                data_list = [query_rollup_cube(cube, lga_name, cpo_selected, start_date, end_date, agg_list, interval_option)
+                             for agg_list in agg_lists]
+            if any(data is None for data in data_list):
+                return None
+        elif warehouse is not None:
+            # filtered and summed out of core, only the selection's totals are loaded
+            with stage_metrics.timer('compute.warehouse'):
+                data_list = warehouse.process_data_grouping_sets(lga_name, cpo_selected, start_date, end_date,
+                                                                 agg_lists, interval_option, combine_cols=True)
+            if data_list is None:
+                return None
+        else:
+            # CPO, LGA, time period and interval filtered data
+            # only the selected LGA's rows within the period are scanned
+            partition_index = loaded[0]
+            with stage_metrics.timer('compute.filter') as stage:
+                months_data_filtered = partition_index.select(lga_name, cpo_selected, start_date, end_date)
+                stage.rows = len(months_data_filtered)
+            # check for data
+            if len(months_data_filtered) == 0:
+                return None
+            # all three levels from one pivot and one resample
+            with stage_metrics.timer('compute.process_data') as stage:
+                stage.rows = len(months_data_filtered)
+                data_list = process_data_grouping_sets(months_data_filtered, agg_lists, interval_option, combine_cols=True)
+        # value box statistics of all CPOs, cached with the aggregation
+        with stage_metrics.timer('compute.kpis'):
+            data_list = data_list + [cpo_kpis(data_list[0])]
+        # merged uptime histograms of the selected chargers
+        with stage_metrics.timer('compute.uptime_sketches'):
+            uptime_histograms = (query_uptime_sketches(loaded[2], lga_name, cpo_selected, start_date, end_date)
+                                 if loaded is not None else None)
+        return data_list + [uptime_histograms]
+    cache_key = (lga_name, frozenset(cpo_selected), start_date, end_date, interval_option,
+                 tuple(tuple(agg_list) for agg_list in agg_lists))
+    with stage_metrics.timer('compute.total'):
+        return process_data_cache.get_or_compute(cache_key, aggregate)
 
 # Extract the month numbers for start and end
-start_month = months_data['interval'].dt.month.min()
-end_month = months_data['interval'].dt.month.max() + 1
+start_month = startup_state['start_month']
+end_month = startup_state['end_month']
 # generate list of datetime objects
-month_dates = generate_month_dates(months_data, 'interval')
+month_dates = startup_state['month_dates']
 # inverse interval options dictionary
 interval_options_inverse = { v:k for k,v in interval_options.items()}
 #State and LGA dictionary
-state_lga_dict = {
-    state:{lga:lga for lga in sorted(months_data.loc[months_data.state == state,'lga_name'].unique())}
-      for state in sorted(months_data['state'].unique())
-      }
+state_lga_dict = startup_state['state_lga_dict']
 # inverse status labels
 inv_var_labels = {v: k for k, v in var_labels.items()}
 
-def generate_value_boxes(cpo_selected,df):
-    # Dynamically generate value boxes based on categories in the DataFrame
+def generate_value_boxes(cpo_selected,kpi_data):
+    # Dynamically generate value boxes for the CPOs in the KPI table
     max_width = "420px"  # Adjust this as needed
     value_boxes = []
     for cpo in cpo_selected:
-        cpos_in_lga = df.cpo_name.unique()
-        if cpo in cpos_in_lga:
-            icon_base64 = convert_image_to_base64(cpo_styles[cpo]['icon'])
+        if cpo in kpi_data.index:
             #cpo = clean_string(cpo)
             value_boxes.append(
                 ui.div(
                     ui.value_box('',
                         ui.output_ui(f"output_{clean_string(cpo).lower().replace(' ', '_')}"),
                         showcase=ui.img(
-                            src=f"data:image/png;base64,{icon_base64}", 
+                            src=asset_store.src(cpo_styles[cpo]['icon']), 
                             style = "width: 85px; padding: 0; margin: 0"
                         ),
                         theme = ui.value_box_theme(
@@ -75,8 +201,8 @@ app_ui = ui.page_sidebar(
                     ),
         ui.input_selectize("cpo_name",
                             label="Select Charge Point Operator",
-                            choices=list(months_data['cpo_name'].unique()),  
-                            selected=list(months_data['cpo_name'].unique()),
+                            choices=startup_state['cpo_names'],  
+                            selected=startup_state['cpo_names'],
                             multiple=True
                             ),
         ui.output_ui('compute'),
@@ -107,6 +233,11 @@ app_ui = ui.page_sidebar(
         # This section applies gap-3 to space the cards horizontally
         class_="gap-2",  # Bootstrap gap class applied here
     ),
+    ui.card(
+        ui.card_header('Sustained outages', ui.output_text('card_header_outages_lga')),
+        ui.output_data_frame('outage_table'),
+        full_screen=True,
+    ),
     title=ui.popover(
         [ui.h4(
             ui.div(
@@ -140,58 +271,62 @@ def server(input: Inputs, output: Outputs, session: Session):
     cpo_data = reactive.Value(None)
     location_data = reactive.Value(None)
     postcode_data = reactive.Value(None)
+    cpo_kpi_data = reactive.Value(None)
+    cpo_uptime_histograms = reactive.Value(None)
+    # Selection and data version of the aggregation held above, the key of its cached figures
+    data_selection = reactive.Value(None)
     # Dictionary to store dynamically generated output functions
     dynamic_outputs = {}
     # Signal to track if compute() has completed
     compute_completed = reactive.Value(False)
 
       
-    @render.ui
-    @reactive.event(input.cpo_name,input.lga_name,input.period,input.selectize)
-    def compute():
-        # Reset completion flag and cpo_data_filtered
+    # Aggregation runs in the background so other sessions on the worker are not blocked
+    @reactive.extended_task
+    async def aggregate_task(selection, version):
+        loop = asyncio.get_running_loop()
+        data_list = await loop.run_in_executor(compute_executor, aggregate_selection, *selection)
+        return (selection, version), data_list
+
+    @reactive.effect
+    @reactive.event(input.cpo_name,input.lga_name,input.period,input.selectize,data_version)
+    def start_compute():
+        # Reset completion flag and drop any computation still running for older inputs.
+        # A cancelled computation finishes in its thread and is cached, but is not published.
         compute_completed.set(False)
-                
-        with ui.Progress(min=1, max=2) as p:
-            p.set(message="Calculation in progress", detail="This may take a while...")
-            # Convert input.daterange() to datetime with UTC timezone
-            selected = input.period()
-            lga_name = input.lga_name()
-            cpo_selected = input.cpo_name()
-            start_date = pd.to_datetime(month_dates[selected[0]-1],utc = True)
-            end_date = pd.to_datetime((month_dates[selected[1]-1] - pd.Timedelta(days=1)), utc = True)
-            interval_option = input.selectize()
-            
-            # CPO, LGA, time period and interval filtered data
-            # Filter across the selected time period using the converted dates
-            mask1 = ((months_data['interval'] >= start_date) &
-                    (months_data['interval'] < end_date) & 
-                    (months_data['lga_name'] == lga_name) &
-                    (months_data['cpo_name'].isin(cpo_selected)) 
-                    )
-            #Initial filter of data
-            months_data_filtered = months_data.loc[mask1,:]
-            # check for data
-            if len(months_data_filtered) == 0:
-                compute_completed.set(True)
-                return ui.div("No data Available")
-            # aggregate list 1 for cpo_data
-            agg_list1 = ['cpo_name']
-            #aggregate list 2 for location
-            agg_list2 = ['cpo_name','address1','address2','postcode','latitude','longitude']
-            #aggregate list 3 for postcode
-            agg_list3 = ['postcode']
-            data_list = []
-            for i,agg_list in enumerate([agg_list1,agg_list2,agg_list3]):
-                processed_data = process_data(months_data_filtered, agg_list, interval_option, combine_cols=True)
-                p.set(i+1, message="Computing.. Aggregating on column list and time interval")
-                data_list.append(processed_data)  
-            # Mark compute as complete
-            compute_completed.set(True)
+        aggregate_task.cancel()
+        # Convert input.daterange() to datetime with UTC timezone
+        selected = input.period()
+        start_date = pd.to_datetime(month_dates[selected[0]-1],utc = True)
+        end_date = pd.to_datetime((month_dates[selected[1]-1] - pd.Timedelta(days=1)), utc = True)
+        aggregate_task((input.lga_name(), tuple(input.cpo_name()), start_date, end_date, input.selectize()), data_version())
+
+    @reactive.effect
+    def publish_compute():
+        # Publish the finished aggregation to the session's reactive values
+        if aggregate_task.status() != "success":
+            return
+        selection, data_list = aggregate_task.result()
+        if data_list is not None:
             cpo_data.set(data_list[0])
             location_data.set(data_list[1])
             postcode_data.set(data_list[2])
-            return 'Processing complete'
+            cpo_kpi_data.set(data_list[3])
+            cpo_uptime_histograms.set(data_list[4])
+            data_selection.set(selection)
+        # Mark compute as complete
+        compute_completed.set(True)
+
+    @render.ui
+    def compute():
+        status = aggregate_task.status()
+        if status == "running":
+            return ui.div("Calculation in progress, this may take a while...")
+        if status == "error":
+            return ui.div("Calculation failed")
+        if status == "success":
+            return 'Processing complete' if aggregate_task.result()[1] is not None else ui.div("No data Available")
+        return None
        
     @output
     @render.text
@@ -236,11 +371,11 @@ def server(input: Inputs, output: Outputs, session: Session):
             return ui.div("Data is still being computed...")
         # Dynamically generate value boxes based on selected CPOs
         # Generate value boxes based on `cpo_data_filtered_combined_prop`
-        data = cpo_data.get()
+        kpi_data = cpo_kpi_data.get()
         cpo_selected = input.cpo_name()  # Get the selected CPOs
         # Calculate column widths dynamically
         return ui.layout_columns(
-            *generate_value_boxes(cpo_selected,data)
+            *generate_value_boxes(cpo_selected,kpi_data)
                         )  # Regenerate value boxes
     
     # Generate dynamic outputs for each CPO based on selection
@@ -250,16 +385,23 @@ def server(input: Inputs, output: Outputs, session: Session):
         
         @output(id=output_name)
         @render.text
-        @reactive.event(input.cpo_name,input.lga_name,input.period,input.selectize)  # Trigger updates when `cpo` changes
+        @reactive.event(input.cpo_name,input.lga_name,input.period,input.selectize,input.threshold)  # Trigger updates when `cpo` changes
         def output_text(cpo=cpo):
-            data = cpo_data.get()
-            # relevant Hourly stats
-            average_uptime = data.loc[data.cpo_name == cpo,:].eval('in_use + Available').mean()
-            minimum_uptime = data.loc[data.cpo_name == cpo,:].eval('in_use + Available').min()
-            average_utilisation = data.loc[data.cpo_name == cpo,:].eval('in_use').mean()
-            maximum_unavailability = data.loc[data.cpo_name == cpo,'unavailable_out_of_order'].max()
-            average_unavailability = data.loc[data.cpo_name == cpo,'unavailable_out_of_order'].mean()
-            evse_count = data.loc[data.cpo_name == cpo,'evse_port_site_count']
+            # relevant Hourly stats, precomputed for all CPOs with the aggregation
+            kpis = cpo_kpi_data.get().loc[cpo]
+            # spread of the chargers' daily uptime, from the merged histograms
+            uptime_histograms = cpo_uptime_histograms.get()
+            uptime_spread = ""
+            if uptime_histograms is not None and cpo in uptime_histograms.index:
+                spread = uptime_distribution(uptime_histograms.loc[[cpo]], input.threshold()).loc[cpo]
+                uptime_spread = (f"<strong>Daily Uptime p5/p50/p95:</strong> {spread['p5']:.1f}% / {spread['p50']:.1f}% / {spread['p95']:.1f}%<br>"
+                                 f"<strong>Charger days under {input.threshold():.0f}%:</strong> {spread['below_threshold']:.1f}%<br>")
+            average_uptime = kpis['average_uptime']
+            minimum_uptime = kpis['minimum_uptime']
+            average_utilisation = kpis['average_utilisation']
+            maximum_unavailability = kpis['maximum_unavailability']
+            average_unavailability = kpis['average_unavailability']
+            evse_count = kpis['evse_count']
             period_duration =  selected_period[1] - selected_period[0]
             if (period_duration > 1) or (interval_option != 'ME'):
                 return ui.div(
@@ -267,11 +409,12 @@ def server(input: Inputs, output: Outputs, session: Session):
                         f"""
                         <div style="font-size: 0.4em; line-height: 1.1;">
                             <strong>{cpo}'s {interval_options[interval_option]} statistics</strong><br>
-                            <strong>Number of chargers:</strong> {int(evse_count.max())} chargers<br>
+                            <strong>Number of chargers:</strong> {int(evse_count)} chargers<br>
                             <strong>Average Uptime:</strong> {average_uptime: .1f}% per {interval_options2[interval_option]}<br>
                             <strong>Minimum Uptime:</strong> {minimum_uptime: .1f}% per {interval_options2[interval_option]}<br>
                             <strong>Average Utilisation:</strong> {average_utilisation: .1f}% per {interval_options2[interval_option]}<br>
                             <strong>Maximum Unavailability:</strong> {maximum_unavailability: .1f}% per {interval_options2[interval_option]}<br>
+                            {uptime_spread}
                         </div>
                         """
                     ),
@@ -283,10 +426,11 @@ def server(input: Inputs, output: Outputs, session: Session):
                         f"""
                         <div style="font-size: 0.4em; line-height: 1.1;">
                             <strong>{cpo}'s {interval_options[interval_option]} statistics</strong><br>
-                            <strong>Number of chargers:</strong> {int(evse_count.max())} chargers<br>
+                            <strong>Number of chargers:</strong> {int(evse_count)} chargers<br>
                             <strong>Uptime:</strong> {average_uptime: .1f}%<br>
                             <strong>Utilisation:</strong> {average_utilisation: .1f}%<br>
                             <strong>Unavailability:</strong> {maximum_unavailability: .1f}%<br>
+                            {uptime_spread}
                         </div>
                         """
                     ),
@@ -298,7 +442,7 @@ def server(input: Inputs, output: Outputs, session: Session):
     # Loop over unique CPOs and create dynamic output functions
     @reactive.Effect
     def dynamic_output_creation():
-        if not compute_completed.get() or cpo_data.get() is None:
+        if not compute_completed.get() or cpo_kpi_data.get() is None:
             return
         # Ensure compute has completed before proceeding
         interval_option = input.selectize()
@@ -306,9 +450,9 @@ def server(input: Inputs, output: Outputs, session: Session):
          # Clear any existing outputs
         dynamic_outputs.clear()
         # Create a unique output for each CPO in the selection
+        kpi_data = cpo_kpi_data.get()
         for cpo in input.cpo_name():
-            data = cpo_data.get()
-            if cpo in data.cpo_name.unique():
+            if cpo in kpi_data.index:
                 create_output_func(cpo,interval_option,selected_period)       
    
     @render.ui  
@@ -330,8 +474,14 @@ def server(input: Inputs, output: Outputs, session: Session):
     @output
     @render_widget
     def chloropleth_map():
-        status_prop = input.status_prop()
-        lga_name = input.lga_name()   
+        # status changes restyle the rendered map in update_map_status
+        with reactive.isolate():
+            status_prop = input.status_prop()
+        # wait for the background aggregation
+        req(compute_completed.get(), location_data.get() is not None)
+        # the LGA the data was aggregated for, the input may already have moved on
+        selection = data_selection.get()
+        lga_name = selection[0][0]
         data2 = location_data.get()
         data1 = postcode_data.get()
         
@@ -346,30 +496,114 @@ def server(input: Inputs, output: Outputs, session: Session):
         #    filtered_data[col] = filtered_data[col].apply(lambda x: round(x*100,1))
             # Create the choropleth map
 
-        return plot_chloropleth_map(data1,
-                                    data2,
-                                    geodf_filter_poa,
-                                    lga_geogcoord_dict,
-                                    status_prop,
-                                    lga_name,
-                                    poa_suburb
-                                    )
+        # sessions showing the same selection share the serialised figure
+        figure_key = (lga_name, 'chloropleth_map', selection, status_prop)
+        with stage_metrics.timer('map.figure') as stage:
+            payload = figure_cache.get_or_compute(figure_key, lambda: plot_chloropleth_map(data1,
+                                                                                          data2,
+                                                                                          geometry_service.geojson(lga_name),
+                                                                                          lga_geogcoord_dict,
+                                                                                          status_prop,
+                                                                                          lga_name,
+                                                                                          poa_suburb
+                                                                                          ).to_json())
+            stage.bytes = len(payload)
+            return figure_widget(payload)
+
+    @reactive.effect
+    @reactive.event(input.status_prop)
+    def update_map_status():
+        map_widget = chloropleth_map.widget
+        if map_widget is None or not compute_completed.get():
+            return
+        # rebuild the figure without geometry and copy only the values into the map
+        with reactive.isolate():
+            map_fig = plot_chloropleth_map(postcode_data.get(),
+                                           location_data.get(),
+                                           {'type': 'FeatureCollection', 'features': []},
+                                           lga_geogcoord_dict,
+                                           input.status_prop(),
+                                           data_selection.get()[0][0],
+                                           poa_suburb
+                                           )
+        with stage_metrics.timer('map.restyle'):
+            update_chloropleth_map(map_widget, map_fig)
         
+    # bars of the column graph, recomputed only when the data, status or interval change
+    @reactive.calc
+    def column_bars():
+        # wait for the background aggregation
+        req(compute_completed.get(), cpo_data.get() is not None)
+        data1 = cpo_data.get()
+        with stage_metrics.timer('column_graph.data') as stage:
+            stage.rows = len(data1)
+            return column_graph_data(data1, input.status_prop(), input.selectize(), input.period())
+
     @output
     @render_widget
     def column_graph():
         status_prop = input.status_prop()
-        threshold = input.threshold()
+        # threshold changes move the line in update_column_threshold
+        with reactive.isolate():
+            threshold = input.threshold()
         interval_option = input.selectize()
         selected_period = input.period()        
-        data1 = cpo_data.get()
+        # wait for the background aggregation
+        req(compute_completed.get(), data_selection.get() is not None)
         
-        return  plot_column_graph(data1,
-                                  status_prop,
-                                  threshold,
-                                  interval_option,
-                                  selected_period
-                         )
+        # sessions showing the same selection share the serialised figure, the bars are only computed on a miss
+        figure_key = (data_selection.get()[0][0], 'column_graph', data_selection.get(), status_prop, threshold, selected_period)
+        with stage_metrics.timer('column_graph.figure') as stage:
+            payload = figure_cache.get_or_compute(figure_key, lambda: plot_column_graph(cpo_data.get(),
+                                                                                       status_prop,
+                                                                                       threshold,
+                                                                                       interval_option,
+                                                                                       selected_period,
+                                                                                       column_bars()
+                                                                                       ).to_json())
+            stage.bytes = len(payload)
+            return figure_widget(payload)
+
+    @reactive.effect
+    @reactive.event(input.threshold)
+    def update_column_threshold():
+        graph_widget = column_graph.widget
+        if graph_widget is None:
+            return
+        with stage_metrics.timer('column_graph.threshold'):
+            update_column_graph_threshold(graph_widget, input.threshold())
+
+    @output
+    @render.text
+    def card_header_outages_lga():
+        return f"for {input.lga_name()}."
+
+    # active and past outages of the selection, refreshed when new intervals are ingested
+    @output
+    @render.data_frame
+    async def outage_table():
+        req(observations is not None)
+        data_version()
+        selected = input.period()
+        start_date = pd.to_datetime(month_dates[selected[0]-1], utc = True)
+        end_date = pd.to_datetime(month_dates[selected[1]-1], utc = True)
+        lga_name, cpo_selected = input.lga_name(), input.cpo_name()
+        # the first query loads the observations, off the event loop
+        loop = asyncio.get_running_loop()
+        outage_detector = (await loop.run_in_executor(compute_executor, observations.get))[1]
+        with stage_metrics.timer('outages.table') as stage:
+            outages = lga_outages(outage_detector.outages(), lga_name, cpo_selected, start_date, end_date)
+            stage.rows = len(outages)
+        return render.DataGrid(outages, width = "100%", height = "300px")
      
 # Call App() to combine app_ui and server() into an interactive app
-app = App(app_ui, server, debug = True)
\ No newline at end of file
+app = App(app_ui, server, debug = True)
+routes = []
+# serve the CPO logos as cacheable static files next to the app
+if serve_static_assets:
+    routes.append(Mount(asset_url_prefix, asset_store.asgi_app()))
+# stage timings in the Prometheus text format
+if metrics_enabled:
+    routes.append(Route(metrics_path, metrics_endpoint))
+if routes:
+    app = Starlette(routes=routes + [Mount("/", app)])
\ No newline at end of file
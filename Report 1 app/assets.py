@@ -0,0 +1,88 @@
+#assets.py
+#import module
+import base64
+import hashlib
+import mimetypes
+#import functions
+from pathlib import Path
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+from config import *
+from blob_loader import BlobLoader
+
+
+class AssetStore:
+    """
+    Images read once at startup and kept in memory, from the app's img directory
+    or, in the cloud, from the blob container.
+
+    Each image is available as a base64 data URI for inline use, or as a
+    content-hashed URL served by `asgi_app()` with an ETag so browsers cache it.
+    """
+
+    def __init__(self, image_files, local_env=True, container_name="your-container-name", url_prefix=asset_url_prefix):
+        self.url_prefix = url_prefix
+        self._content = {}
+        if local_env:
+            img_dir = Path(__file__).parent / "img"
+            for image_file in image_files:
+                self._content[image_file] = (img_dir / image_file).read_bytes()
+        else:
+            blob_paths = BlobLoader(container_name=container_name).fetch_all([f"img/{image_file}" for image_file in image_files])
+            for image_file in image_files:
+                self._content[image_file] = blob_paths[f"img/{image_file}"].read_bytes()
+        self._etags = {name: hashlib.sha1(content).hexdigest()[:16] for name, content in self._content.items()}
+        self._data_uris = {}
+
+    @staticmethod
+    def media_type(image_file: str) -> str:
+        return mimetypes.guess_type(image_file)[0] or "application/octet-stream"
+
+    def data_uri(self, image_file: str) -> str:
+        """
+        Args:
+            image_file (str): Image name, e.g. 'wevolt.png'.
+
+        Returns:
+            str: base64 data URI, encoded on first use.
+        """
+        if image_file not in self._data_uris:
+            encoded = base64.b64encode(self._content[image_file]).decode("utf-8")
+            self._data_uris[image_file] = f"data:{self.media_type(image_file)};base64,{encoded}"
+        return self._data_uris[image_file]
+
+    def url(self, image_file: str) -> str:
+        """
+        Args:
+            image_file (str): Image name.
+
+        Returns:
+            str: URL served by asgi_app(), versioned by content hash.
+        """
+        return f"{self.url_prefix}/{image_file}?v={self._etags[image_file]}"
+
+    def src(self, image_file: str) -> str:
+        """
+        Image source for the UI, a static URL when config.serve_static_assets is set,
+        otherwise a data URI.
+        """
+        return self.url(image_file) if serve_static_assets else self.data_uri(image_file)
+
+    async def _serve(self, request: Request) -> Response:
+        image_file = request.path_params["image_file"]
+        if image_file not in self._content:
+            return Response(status_code=404)
+        etag = f'"{self._etags[image_file]}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(self._content[image_file], media_type=self.media_type(image_file), headers=headers)
+
+    def asgi_app(self) -> Starlette:
+        """
+        Returns:
+            Starlette: App serving the images, to be mounted at url_prefix.
+        """
+        return Starlette(routes=[Route("/{image_file}", self._serve)])
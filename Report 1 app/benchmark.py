@@ -0,0 +1,204 @@
+#benchmark.py
+#import module
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+#import functions
+from pathlib import Path
+from config import *
+from utilities import (load_and_prepare_data, convert_dataframe_timezone, process_data,
+                       process_data_grouping_sets, plot_chloropleth_map, plot_column_graph)
+from data_store import read_status_csv, to_wide_status, write_status_parquet
+from geometry import GeometryService
+from partition_index import PartitionIndex
+from synthetic_data import synthetic_status_data
+
+app_dir = Path(__file__).parent
+# Default location of the JSON results
+benchmark_dir = app_dir / "benchmark_results"
+# Scales as (CPOs, sites, minutes)
+default_scales = {'small': (4, 100, 7*24*60), 'medium': (8, 1_000, 7*24*60), 'large': (16, 5_000, 14*24*60)}
+# Stages slower than this factor of the compared run, and by more than the
+# minimum seconds, are reported as regressions
+regression_factor = 1.2
+regression_min_seconds = 0.05
+
+
+def measure(stage: str, func, rows: int, repeat=1, trace_memory=True) -> tuple:
+    """
+    Times a stage and records its peak traced memory.
+
+    The peak comes from an extra tracemalloc run, which covers numpy and pandas
+    allocations but not Arrow's own memory pool. The time is the fastest of the runs.
+
+    Args:
+        stage (str): Stage name.
+        func (callable): Zero-argument function running the stage.
+        rows (int): Rows processed, for the throughput.
+        repeat (int, optional): Number of timed runs. Defaults to 1.
+        trace_memory (bool, optional): Measure the peak memory. Defaults to True.
+
+    Returns:
+        tuple: (result dict, return value of the last run).
+    """
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+    return {'stage': stage, 'seconds': seconds, 'rows': rows,
+            'rows_per_sec': rows / seconds if seconds else None,
+            'peak_mb': peak}, value
+
+
+def run_scale(scale: str, n_cpos: int, n_sites: int, minutes: int, repeat=1, trace_memory=True) -> list:
+    """
+    Benchmarks every stage on synthetic data of one size.
+
+    Args:
+        scale (str): Name of the scale.
+        n_cpos (int): Number of CPOs.
+        n_sites (int): Number of sites.
+        minutes (int): Length of the period in minutes.
+        repeat (int, optional): Timed runs per stage. Defaults to 1.
+        trace_memory (bool, optional): Measure peak memory. Defaults to True.
+
+    Returns:
+        list: One result dict per stage.
+    """
+    results = []
+    def record(stage, func, rows):
+        result, value = measure(stage, func, rows, repeat, trace_memory)
+        results.append({'scale': scale, 'cpos': n_cpos, 'sites': n_sites, 'minutes': minutes} | result)
+        peak = f"{result['peak_mb']:9.1f} MB" if result['peak_mb'] is not None else ""
+        print(f"{scale:>8} {stage:<32} {result['seconds']:9.3f}s {result['rows_per_sec'] or 0:14,.0f} rows/s {peak}")
+        return value
+
+    long_data = record('generate', lambda: synthetic_status_data(n_cpos, n_sites, minutes), n_sites * minutes // 15 * 9)
+    rows = len(long_data)
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_dir = Path(data_dir)
+        for file_name in ['geodf_lga_filter.json', 'geodf_poa_filter.json', 'lga_geogcoord_df.csv']:
+            shutil.copy(app_dir / file_name, data_dir / file_name)
+        # setup, not an app stage
+        pa_csv.write_csv(pa.Table.from_pandas(long_data, preserve_index=False), data_dir / "final_processed_data.csv")
+        record('read_csv', lambda: read_status_csv(data_dir / "final_processed_data.csv"), rows)
+        record('load_and_prepare_data_csv', lambda: load_and_prepare_data(data_dir=data_dir), rows)
+        record('write_parquet', lambda: write_status_parquet(long_data, data_dir / "final_processed_data.parquet"), rows)
+        months_data, lga_geogcoord_dict, poa_suburb, geodf_filter_lga, geodf_filter_poa = record(
+            'load_and_prepare_data_parquet', lambda: load_and_prepare_data(data_dir=data_dir), rows)
+    wide_data = record('to_wide_status', lambda: to_wide_status(long_data), rows)
+    record('convert_dataframe_timezone', lambda: convert_dataframe_timezone(wide_data, 'interval', 'state'), rows)
+
+    partition_index = record('partition_index', lambda: PartitionIndex(months_data), rows)
+
+    # the LGA with the most sites, all CPOs, the whole period, selected in the LGA's timezone like the app
+    lga_name = months_data['lga_name'].value_counts().index[0]
+    cpo_selected = months_data['cpo_name'].unique().tolist()
+    start_date, end_date = months_data['interval'].min(), months_data['interval'].max() + pd.Timedelta(days=1)
+    selection = record('partition_index_select',
+                       lambda: partition_index.select(lga_name, cpo_selected, start_date, end_date),
+                       int((months_data['lga_name'] == lga_name).sum()))
+    selected_rows = int(selection[['Total']].notna().sum().iloc[0]) * 9
+    agg_lists = [agg_levels['cpo'], agg_levels['site'], agg_levels['postcode']]
+    for interval_option in ['60min', '1440min', 'ME']:
+        for level, agg_cols in agg_levels.items():
+            record(f'process_data_{level}_{interval_option}',
+                   lambda: process_data(selection, agg_cols, interval_option, True), selected_rows)
+        data_list = record(f'grouping_sets_{interval_option}',
+                           lambda: process_data_grouping_sets(selection, agg_lists, interval_option, True), selected_rows)
+
+    lga_postcodes = {lga_name: selection['postcode'].unique().tolist()}
+    geometry_service = record('geometry_service',
+                              lambda: GeometryService(geodf_filter_poa, geodf_filter_lga, lga_geogcoord_dict, lga_postcodes),
+                              len(geodf_filter_poa))
+    cpo_data, location_data, postcode_data = data_list
+    record('plot_chloropleth_map',
+           lambda: plot_chloropleth_map(postcode_data, location_data, geometry_service.geojson(lga_name),
+                                        lga_geogcoord_dict, 'in_use', lga_name, poa_suburb),
+           len(postcode_data) + len(location_data))
+    record('plot_column_graph',
+           lambda: plot_column_graph(cpo_data, 'in_use', 50, 'ME', (1, 2)),
+           len(cpo_data))
+    return results
+
+
+def run_metadata() -> dict:
+    """
+    Returns:
+        dict: Commit, library versions and machine of the run.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=app_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'timestamp': pd.Timestamp.now(tz='UTC').isoformat(), 'commit': commit,
+            'python': platform.python_version(), 'pandas': pd.__version__,
+            'machine': platform.machine(), 'processor': platform.processor()}
+
+
+def compare_results(results: list, baseline_path) -> list:
+    """
+    Prints each stage's time relative to an earlier run.
+
+    Args:
+        results (list): Results of this run.
+        baseline_path (str | Path): JSON file of the earlier run.
+
+    Returns:
+        list: (scale, stage, ratio) of the stages that regressed.
+    """
+    baseline = {(result['scale'], result['stage']): result['seconds']
+                for result in json.loads(Path(baseline_path).read_text())['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get((result['scale'], result['stage']))
+        if not before:
+            continue
+        ratio = result['seconds'] / before
+        flag = " REGRESSION" if ratio > regression_factor and result['seconds'] - before > regression_min_seconds else ""
+        print(f"{result['scale']:>8} {result['stage']:<32} {ratio:6.2f}x{flag}")
+        if flag:
+            regressions.append((result['scale'], result['stage'], ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's data stages on synthetic data.")
+    parser.add_argument("--scales", nargs="+", default=['small', 'medium'],
+                        help=f"Named scales {list(default_scales)} or CPOS:SITES:MINUTES")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per stage, the fastest is kept")
+    parser.add_argument("--skip-memory", action="store_true", help="Do not trace peak memory, which slows the run down")
+    parser.add_argument("--output", default=None, help="JSON results file, defaults to benchmark_results/<timestamp>.json")
+    parser.add_argument("--compare", default=None, help="Earlier JSON results file to compare against")
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    results = []
+    for scale in args.scales:
+        n_cpos, n_sites, minutes = default_scales[scale] if scale in default_scales else map(int, scale.split(':'))
+        results += run_scale(scale, n_cpos, n_sites, minutes, args.repeat, not args.skip_memory)
+    metadata = run_metadata()
+    output_path = Path(args.output) if args.output else benchmark_dir / f"{pd.Timestamp(metadata['timestamp']):%Y%m%dT%H%M%S}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps({'metadata': metadata, 'results': results}, indent=2))
+    print(f"Written {output_path}")
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,92 @@
+#blob_loader.py
+#import module
+import json
+import os
+#import functions
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient
+from config import *
+
+
+class BlobLoader:
+    """
+    Downloads blobs from one container into a local disk cache.
+
+    A single BlobServiceClient (and its pooled HTTP connections) is shared by
+    concurrent downloads. Each blob is streamed to disk in chunks instead of being
+    read into memory. A cached copy is revalidated with its ETag, so a warm restart
+    only makes a conditional request per blob and downloads nothing unchanged.
+    When the storage account cannot be reached, cached copies are used as they are.
+    Works against Azurite with its development connection string.
+    """
+
+    def __init__(self,
+                 connection_string=None,
+                 container_name="your-container-name",
+                 cache_dir=blob_cache_dir,
+                 max_workers=blob_download_workers):
+        connection_string = connection_string or os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+        self.container_client = (BlobServiceClient.from_connection_string(connection_string)
+                                 .get_container_client(os.getenv("AZURE_CONTAINER_NAME", container_name)))
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+
+    def _cache_paths(self, blob_name: str):
+        path = self.cache_dir / blob_name
+        return path, path.with_name(path.name + ".etag")
+
+    def fetch(self, blob_name: str):
+        """
+        Local path of a blob, downloading it only when the cached copy is missing or stale.
+
+        Args:
+            blob_name (str): Blob name within the container.
+
+        Returns:
+            Path | None: Cached file, or None when the blob does not exist.
+        """
+        path, meta_path = self._cache_paths(blob_name)
+        cached = json.loads(meta_path.read_text()) if path.exists() and meta_path.exists() else None
+        blob_client = self.container_client.get_blob_client(blob_name)
+        try:
+            if cached is None:
+                downloader = blob_client.download_blob(max_concurrency=blob_chunk_concurrency)
+            else:
+                downloader = blob_client.download_blob(max_concurrency=blob_chunk_concurrency,
+                                                       etag=cached['etag'],
+                                                       match_condition=MatchConditions.IfModified)
+        except ResourceNotFoundError:
+            return None
+        except Exception as e:
+            # the cached copy is current
+            if isinstance(e, HttpResponseError) and e.status_code == 304:
+                return path
+            if cached is None:
+                raise
+            print(f"Using cached {blob_name}, could not revalidate: {e}")
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so a crash never leaves a partial file in the cache
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            downloader.readinto(f)
+        tmp_path.replace(path)
+        meta_path.write_text(json.dumps({'etag': downloader.properties.etag,
+                                         'last_modified': downloader.properties.last_modified.isoformat()}))
+        return path
+
+    def fetch_all(self, blob_names) -> dict:
+        """
+        Fetches several blobs concurrently.
+
+        Args:
+            blob_names (list): Blob names within the container.
+
+        Returns:
+            dict: Blob name to cached file, None for blobs that do not exist.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(blob_names, executor.map(self.fetch, blob_names)))
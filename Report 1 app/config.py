@@ -2,7 +2,9 @@
 from datetime import datetime,timedelta
 import pytz
 import faicons as fa
+import os
 import pandas as pd
+from pathlib import Path
 
 #Current month
 month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%B')
@@ -110,3 +112,109 @@ utilisation_status = {
      "Available":"Available for Use",
      "unavailable_out_of_order":"Unavailable or Out of Order"
      }
+
+# Combined status columns produced by process_data
+combined_status_cols = ['in_use','unavailable_out_of_order','Available','Unknown','Total']
+
+# Background threads running dashboard aggregations
+compute_workers = 4
+
+# Limits of the shared process_data result cache
+result_cache_max_entries = 512
+result_cache_max_bytes = 512 * 1024**2
+# Limits of the shared cache of serialised figures
+figure_cache_max_entries = 256
+figure_cache_max_bytes = 64 * 1024**2
+
+# Status types produced from raw connector events
+event_status_types = ['Charging','Finishing','Reserved','Unavailable','Out of order','Available','Unknown']
+# Raw OCPP / OCPI connector statuses mapped onto the status types
+status_aliases = {"Preparing": "Charging",
+                  "SuspendedEV": "Charging",
+                  "SuspendedEVSE": "Charging",
+                  "Occupied": "Charging",
+                  "Faulted": "Out of order",
+                  "OutOfOrder": "Out of order",
+                  "AVAILABLE": "Available",
+                  "CHARGING": "Charging",
+                  "RESERVED": "Reserved",
+                  "BLOCKED": "Unavailable",
+                  "INOPERATIVE": "Unavailable",
+                  "PLANNED": "Unavailable",
+                  "REMOVED": "Unavailable",
+                  "OUTOFORDER": "Out of order",
+                  "UNKNOWN": "Unknown"}
+# Longest time a connector status holds without a new observation
+event_max_gap = pd.Timedelta(minutes=15)
+
+# Directory polled for new status observation files
+ingest_dir = Path(__file__).parent / "incoming"
+ingest_poll_secs = 60
+
+# Status feed receiver interface, ports and flush thresholds; bind to 0.0.0.0 to accept pushes from other hosts
+feed_host = "127.0.0.1"
+feed_ws_port = 8766
+feed_tcp_port = 8767
+feed_flush_rows = 100_000
+feed_flush_secs = 5.0
+
+# Postcode polygon simplification tolerance (degrees) by map zoom level
+geometry_tolerances = {0: 0.01, 7: 0.002, 10: 0.0005}
+# Grid size coordinates are rounded to (degrees)
+geometry_precision = 1e-5
+# Share of a postcode's area that must lie in an LGA for it to be drawn with the LGA
+geometry_min_overlap = 0.01
+
+# Furthest a site may lie outside every polygon and still be assigned to the nearest (degrees)
+region_max_distance = 0.01
+
+# CPO logos are inlined as data URIs unless served as cacheable static files under asset_url_prefix
+serve_static_assets = False
+asset_url_prefix = "/assets"
+
+# Local cache of downloaded blobs and download concurrency (blobs at once, chunks per blob)
+blob_cache_dir = Path(__file__).parent / "blob_cache"
+blob_download_workers = 8
+blob_chunk_concurrency = 4
+
+# Skew of synthetic sites over LGAs (Zipf exponent)
+synthetic_lga_zipf = 1.3
+
+# Stage instrumentation served at metrics_path, off unless DASHBOARD_METRICS=1 as the endpoint is unauthenticated
+metrics_enabled = os.getenv("DASHBOARD_METRICS", "0") == "1"
+metrics_path = "/metrics"
+metrics_buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+# Set DASHBOARD_PROFILE_SLOW_SECS to profile requests, those slower than it are saved to profile_dir
+profile_slow_secs = float(os.environ["DASHBOARD_PROFILE_SLOW_SECS"]) if "DASHBOARD_PROFILE_SLOW_SECS" in os.environ else None
+profile_dir = Path(__file__).parent / "profiles"
+
+# Partitioned Parquet queried out of core with DuckDB, used instead of the in-memory data once built with warehouse.py
+warehouse_dir = Path(__file__).parent / "warehouse"
+warehouse_memory_limit = "4GB"
+warehouse_threads = 4
+
+# Batch reports written by reports.py, one directory per month
+report_dir = Path(__file__).parent / "reports"
+report_workers = os.cpu_count()
+report_interval = "60min"
+
+# Bins of the per-charger uptime histograms merged for the uptime distribution
+uptime_sketch_bins = 100
+
+# Start-up state prebuilt by snapshot.py, the observations are then loaded on the first query
+snapshot_path = Path(__file__).parent / "startup_snapshot.pkl"
+
+# Shortest run of each status flagged as an outage by the outage detector
+outage_min_durations = {'Out of order': pd.Timedelta(hours=1),
+                        'Unavailable': pd.Timedelta(hours=1),
+                        'Unknown': pd.Timedelta(hours=3)}
+# Longest gap between observations of a site within one outage run
+outage_max_gap = pd.Timedelta(minutes=30)
+# Length of the observed status intervals, an outage run lasts to the end of its last interval
+outage_interval = pd.Timedelta(minutes=15)
+
+# Aggregation levels used by the dashboard
+agg_levels = {"cpo": ['cpo_name'],
+              "site": ['cpo_name','address1','address2','postcode','latitude','longitude'],
+              "postcode": ['postcode']
+              }
@@ -0,0 +1,218 @@
+#data_store.py
+#import module
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+#import functions
+from pathlib import Path
+
+# String columns stored dictionary encoded (pandas categoricals)
+categorical_cols = ['cpo_name', 'lga_name', 'state', 'address1', 'address2', 'postcode', 'variable']
+
+# Explicit on-disk schema for the status observations
+status_schema = pa.schema([
+    *[pa.field(col, pa.dictionary(pa.int32(), pa.string())) for col in categorical_cols[:6]],
+    pa.field('latitude', pa.float64()),
+    pa.field('longitude', pa.float64()),
+    pa.field('interval', pa.timestamp('ns', tz='UTC')),
+    pa.field('variable', pa.dictionary(pa.int32(), pa.string())),
+    pa.field('value', pa.int32()),
+])
+
+# Status count columns of the wide layout, one per 'variable' of the long layout
+status_value_cols = ['Available', 'Charging', 'Finishing', 'Out of order', 'Reserved', 'Total',
+                     'Unavailable', 'Unknown', 'evse_port_site_count']
+
+# pandas dtypes used when the CSV has to be parsed
+csv_dtypes = {col: 'category' for col in categorical_cols} | {'value': 'int32',
+                                                              'latitude': 'float64',
+                                                              'longitude': 'float64'}
+
+
+def sort_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sorts the categories of the dictionary encoded columns so groupby output
+    keeps the lexical order the object columns used to have.
+
+    Args:
+        df (pd.DataFrame): Typed status observations.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with sorted categories.
+    """
+    for col in df.columns.intersection(categorical_cols):
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
+
+
+def is_stale(outputs: list, sources: list) -> bool:
+    """
+    Args:
+        outputs (list): Paths of files built from the sources.
+        sources (list): Paths of the source files, missing ones are ignored.
+
+    Returns:
+        bool: True when a source was modified after the oldest output was written.
+    """
+    sources = [Path(path).stat().st_mtime_ns for path in sources if Path(path).exists()]
+    return bool(sources) and max(sources) > min(Path(path).stat().st_mtime_ns for path in outputs)
+
+
+def apply_status_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts a long-format status DataFrame to the typed in-memory schema.
+
+    Args:
+        df (pd.DataFrame): Status observations with the final_processed_data.csv columns.
+
+    Returns:
+        pd.DataFrame: DataFrame with categorical strings, int32 values and a UTC 'interval'.
+    """
+    df = df.astype({col: dtype for col, dtype in csv_dtypes.items() if col in df.columns})
+    # postcodes are labels, keep them as strings to match the geojson index
+    if 'postcode' in df.columns and not pd.api.types.is_string_dtype(df['postcode'].cat.categories):
+        df['postcode'] = df['postcode'].cat.rename_categories(lambda x: str(x))
+    df['interval'] = pd.to_datetime(df['interval'], utc=True)
+    return sort_categories(df)
+
+
+def to_wide_status(df: pd.DataFrame, var_col='variable') -> pd.DataFrame:
+    """
+    Pivots long-format observations to one row per site and interval with one
+    column of counts per status, so the site columns are stored once instead of
+    once per status. Repeated observations of a status are summed, like the
+    pivot_table they replace. Counts are downcast to the smallest integer type that holds
+    them, a column with missing statuses is stored as float32.
+
+    Args:
+        df (pd.DataFrame): Typed long-format status observations.
+        var_col (str, optional): Name of the status column. Defaults to 'variable'.
+
+    Returns:
+        pd.DataFrame: Wide status observations.
+    """
+    key_cols = [col for col in df.columns if col not in (var_col, 'value')]
+    # row of each observation in the wide frame, numbered in first-seen order
+    row = df.groupby(key_cols, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+    first = np.unique(row, return_index=True)[1]
+    wide = df[key_cols].iloc[first].reset_index(drop=True)
+    statuses = df[var_col].astype('category')
+    shape = (len(wide), len(statuses.cat.categories))
+    cell = row * shape[1] + statuses.cat.codes.to_numpy()
+    values = np.bincount(cell, weights=df['value'].to_numpy('float64'), minlength=shape[0] * shape[1]).reshape(shape)
+    # statuses never observed for a row stay missing rather than zero
+    values[np.bincount(cell, minlength=shape[0] * shape[1]).reshape(shape) == 0] = np.nan
+    for position, status in enumerate(statuses.cat.categories):
+        column = values[:, position]
+        wide[status] = column.astype('float32') if np.isnan(column).any() else pd.to_numeric(column.astype('int64'), downcast='integer')
+    return wide
+
+
+def memory_footprint(df: pd.DataFrame, var_col='variable') -> dict:
+    """
+    In-memory size of status observations, one observation being one status count
+    of one site and interval.
+
+    Args:
+        df (pd.DataFrame): Long or wide status observations.
+        var_col (str, optional): Name of the status column of the long layout. Defaults to 'variable'.
+
+    Returns:
+        dict: 'bytes', 'observations' and 'bytes_per_observation'.
+    """
+    nbytes = int(df.memory_usage(deep=True, index=True).sum())
+    if var_col in df.columns:
+        observations = len(df)
+    else:
+        observations = int(df[df.columns.intersection(status_value_cols)].notna().sum().sum())
+    return {'bytes': nbytes, 'observations': observations, 'bytes_per_observation': nbytes / max(observations, 1)}
+
+
+def read_status_csv(source) -> pd.DataFrame:
+    """
+    Reads final_processed_data.csv straight into the typed schema.
+
+    Args:
+        source (str | Path | file-like): CSV path or buffer.
+
+    Returns:
+        pd.DataFrame: Typed status observations.
+    """
+    dtypes = csv_dtypes | {'postcode': 'str'}
+    df = pd.read_csv(source, dtype=dtypes)
+    df['postcode'] = df['postcode'].astype('category')
+    return apply_status_schema(df)
+
+
+def read_status_parquet(source, columns=None, filters=None) -> pd.DataFrame:
+    """
+    Reads status observations stored in the columnar format.
+
+    Args:
+        source (str | Path | file-like): Parquet path or buffer.
+        columns (list, optional): Subset of columns to load. Defaults to all.
+        filters (list, optional): pyarrow row filters, e.g. [('lga_name', '==', 'Albury')].
+
+    Returns:
+        pd.DataFrame: Typed status observations.
+    """
+    table = pq.read_table(source, columns=columns, filters=filters, memory_map=True)
+    return sort_categories(table.to_pandas())
+
+
+def write_status_parquet(df: pd.DataFrame, destination, row_group_size=1_000_000):
+    """
+    Writes status observations to Parquet using the explicit schema.
+
+    Args:
+        df (pd.DataFrame): Status observations (long format).
+        destination (str | Path | file-like): Output path or buffer.
+        row_group_size (int, optional): Rows per Parquet row group. Defaults to 1,000,000.
+    """
+    df = apply_status_schema(df)
+    table = pa.Table.from_pandas(df[status_schema.names], schema=status_schema, preserve_index=False)
+    pq.write_table(table, destination, row_group_size=row_group_size, compression='zstd')
+
+
+def convert_csv_to_parquet(csv_path, parquet_path=None, chunksize=5_000_000) -> Path:
+    """
+    One-shot conversion of final_processed_data.csv to the columnar format.
+    The CSV is streamed in chunks so the conversion does not need the whole file in memory.
+
+    Args:
+        csv_path (str | Path): Source CSV file.
+        parquet_path (str | Path, optional): Destination file. Defaults to the CSV path with a .parquet suffix.
+        chunksize (int, optional): Number of CSV rows parsed per chunk. Defaults to 5,000,000.
+
+    Returns:
+        Path: Path of the written Parquet file.
+    """
+    csv_path = Path(csv_path)
+    parquet_path = Path(parquet_path) if parquet_path else csv_path.with_suffix('.parquet')
+    dtypes = csv_dtypes | {'postcode': 'str', 'cpo_name': 'str', 'lga_name': 'str', 'state': 'str',
+                           'address1': 'str', 'address2': 'str', 'variable': 'str'}
+    with pq.ParquetWriter(parquet_path, status_schema, compression='zstd') as writer:
+        for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize):
+            chunk['interval'] = pd.to_datetime(chunk['interval'], utc=True)
+            table = pa.Table.from_pandas(chunk[status_schema.names], schema=status_schema, preserve_index=False)
+            writer.write_table(table)
+    return parquet_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert final_processed_data.csv to typed Parquet.")
+    parser.add_argument("csv_path", nargs="?", default=Path(__file__).parent / "final_processed_data.csv")
+    parser.add_argument("parquet_path", nargs="?", default=None)
+    parser.add_argument("--report", action="store_true", help="Only report the in-memory bytes per observation")
+    args = parser.parse_args()
+    if args.report:
+        csv_path = Path(args.csv_path)
+        long_data = read_status_parquet(csv_path) if csv_path.suffix == '.parquet' else read_status_csv(csv_path)
+        for layout, data in [('long', long_data), ('wide', to_wide_status(long_data))]:
+            footprint = memory_footprint(data)
+            print(f"{layout}: {footprint['bytes'] / 1024**2:,.1f} MB, {footprint['observations']:,} observations, "
+                  f"{footprint['bytes_per_observation']:.2f} bytes per observation")
+    else:
+        print(f"Written {convert_csv_to_parquet(args.csv_path, args.parquet_path)}")
@@ -0,0 +1,276 @@
+#feed_receiver.py
+#import module
+import argparse
+import asyncio
+import json
+import time
+import pandas as pd
+#import functions
+from pathlib import Path
+from websockets.asyncio.server import serve
+from config import *
+from status_events import events_to_status_counts, read_table
+from data_store import write_status_parquet
+from site_regions import fill_site_regions
+
+# Fields of a connector status push
+feed_fields = ['cpo_name', 'connector_id', 'timestamp', 'status']
+
+
+class ColumnarBuffer:
+    """
+    Append-only buffer holding one list per field, handed over as a DataFrame on flush.
+    """
+
+    def __init__(self, fields=feed_fields):
+        self.fields = fields
+        self.columns = {field: [] for field in fields}
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]])
+
+    def extend(self, records: list):
+        """
+        Appends status pushes, missing fields are stored as None.
+
+        Args:
+            records (list): Dictionaries with the feed fields.
+        """
+        for field, column in self.columns.items():
+            column.extend(record.get(field) for record in records)
+
+    def drain(self) -> pd.DataFrame:
+        """
+        Returns the buffered pushes as a DataFrame and empties the buffer.
+
+        Returns:
+            pd.DataFrame: One column per field.
+        """
+        columns, self.columns = self.columns, {field: [] for field in self.fields}
+        return pd.DataFrame(columns)
+
+
+def parse_timestamps(events: pd.DataFrame):
+    """
+    Parses the push timestamps to UTC, dropping pushes whose timestamp cannot be parsed.
+
+    Args:
+        events (pd.DataFrame): Status pushes with a `timestamp` column of ISO 8601 strings.
+
+    Returns:
+        tuple: The pushes with parsed timestamps and the number of pushes dropped.
+    """
+    # CPOs send ISO 8601 at different precisions, format='ISO8601' parses each string on its own
+    timestamps = pd.to_datetime(events['timestamp'], utc=True, format='ISO8601', errors='coerce')
+    valid = timestamps.notna()
+    return events.assign(timestamp=timestamps).loc[valid], int((~valid).sum())
+
+
+class StatusCountSink:
+    """
+    Converts flushed status events into per-interval status counts and drops them
+    into the app's ingest directory.
+
+    Only complete intervals are written. Events in the last, still open interval are
+    held for the next flush, and each connector's latest status is carried forward
+    so a status that spans a flush is not counted as Unknown.
+    """
+
+    def __init__(self, connectors: pd.DataFrame, output_dir=ingest_dir, freq='1min'):
+        self.connectors = connectors
+        self.output_dir = Path(output_dir)
+        self.freq = pd.Timedelta(freq)
+        self.watermark = None
+        self.pending = pd.DataFrame(columns=feed_fields)
+        self.carried = pd.DataFrame(columns=feed_fields)
+
+    def __call__(self, events: pd.DataFrame):
+        events, _ = parse_timestamps(events)
+        if not self.pending.empty:
+            events = pd.concat([self.pending, events], ignore_index=True)
+        if events.empty:
+            return None
+        window_end = events['timestamp'].max().floor(self.freq)
+        window_start = self.watermark if self.watermark is not None else events['timestamp'].min().floor(self.freq)
+        self.pending = events.loc[events['timestamp'] >= window_end]
+        events = events.loc[(events['timestamp'] < window_end) & (events['timestamp'] >= window_start)]
+        if window_end <= window_start:
+            return None
+        if not self.carried.empty:
+            events = pd.concat([self.carried, events], ignore_index=True)
+        status_counts = events_to_status_counts(events, self.connectors, self.freq, window_start, window_end)
+        self.carried = events.sort_values('timestamp', kind='stable').drop_duplicates('connector_id', keep='last')
+        self.watermark = window_end
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # write then rename so the app never picks up a half written file
+        path = self.output_dir / f"feed_{window_start:%Y%m%dT%H%M%S}_{window_end:%Y%m%dT%H%M%S}.parquet"
+        write_status_parquet(status_counts, path.with_suffix('.tmp'))
+        path.with_suffix('.tmp').rename(path)
+        return path
+
+
+class FeedReceiver:
+    """
+    asyncio receiver for connector status pushes from many CPOs.
+
+    Pushes arrive over WebSocket (one JSON object or a JSON list of objects per
+    message) or over TCP as newline-delimited JSON. They are appended to a columnar
+    buffer that is flushed to `on_flush` when it reaches `flush_rows` rows or every
+    `flush_secs` seconds. The flush runs in a worker thread so receiving continues.
+    Messages that are not valid JSON, and pushes that lack a field or carry a timestamp
+    that cannot be parsed, are counted in `rejected` and skipped, the connection stays open.
+    """
+
+    def __init__(self, on_flush, flush_rows=feed_flush_rows, flush_secs=feed_flush_secs):
+        self.on_flush = on_flush
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.buffer = ColumnarBuffer()
+        self.received = 0
+        self.rejected = 0
+        self._flush_lock = asyncio.Lock()
+        # a full-buffer flush is scheduled and has not drained the buffer yet
+        self._flush_pending = False
+        self._flush_tasks = set()
+
+    def add(self, payload):
+        """
+        Buffers one decoded push or list of pushes and schedules a flush when the buffer is full.
+
+        Args:
+            payload (dict | list): Decoded JSON message.
+        """
+        records = payload if isinstance(payload, list) else [payload]
+        self.buffer.extend(records)
+        self.received += len(records)
+        # the pending flush drains everything buffered by the time it runs
+        if len(self.buffer) >= self.flush_rows and not self._flush_pending:
+            self._flush_pending = True
+            task = asyncio.create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    def receive(self, message):
+        """
+        Decodes and buffers one message, counting and skipping it when it is not
+        a push or list of pushes.
+
+        Args:
+            message (str | bytes): Raw WebSocket message or TCP line.
+        """
+        try:
+            payload = json.loads(message)
+        except ValueError as e:
+            self.reject(f"invalid JSON ({e})")
+            return
+        records = payload if isinstance(payload, list) else [payload]
+        if not all(isinstance(record, dict) for record in records):
+            self.reject("not a JSON object or list of objects")
+            return
+        complete = [record for record in records if all(record.get(field) is not None for field in feed_fields)]
+        for _ in range(len(records) - len(complete)):
+            self.reject(f"push missing one of {', '.join(feed_fields)}")
+        if complete:
+            self.add(complete)
+
+    def reject(self, reason: str):
+        # the first rejection is printed, the rest are counted in the throughput report
+        if self.rejected == 0:
+            print(f"Skipping malformed status update: {reason}")
+        self.rejected += 1
+
+    async def flush(self):
+        """
+        Hands the buffered pushes to on_flush in a worker thread. Flushes run one at a time
+        so the sink sees batches in arrival order.
+        """
+        async with self._flush_lock:
+            self._flush_pending = False
+            if len(self.buffer) == 0:
+                return
+            events = self.buffer.drain()
+            try:
+                dropped = await asyncio.to_thread(self._flush_events, events)
+            except Exception as e:
+                print(f"Error flushing {len(events)} status updates: {e}")
+                return
+            for _ in range(dropped):
+                self.reject("timestamp is not ISO 8601")
+
+    def _flush_events(self, events: pd.DataFrame) -> int:
+        # runs in the worker thread, returns the pushes dropped for a bad timestamp
+        events, dropped = parse_timestamps(events)
+        if not events.empty:
+            self.on_flush(events)
+        return dropped
+
+    async def handle_websocket(self, websocket):
+        async for message in websocket:
+            self.receive(message)
+
+    async def handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while line := await reader.readline():
+            if line.strip():
+                self.receive(line)
+        writer.close()
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_secs)
+            await self.flush()
+
+    async def serve(self, host=feed_host, ws_port=feed_ws_port, tcp_port=feed_tcp_port):
+        """
+        Runs the WebSocket and TCP listeners until cancelled.
+
+        Args:
+            host (str, optional): Interface to bind. Defaults to config.feed_host, the loopback interface.
+            ws_port (int, optional): WebSocket port. Defaults to config.feed_ws_port.
+            tcp_port (int, optional): Newline-delimited JSON port. Defaults to config.feed_tcp_port.
+        """
+        flusher = asyncio.create_task(self.flush_periodically())
+        tcp_server = await asyncio.start_server(self.handle_tcp, host, tcp_port, limit=2**24)
+        try:
+            async with serve(self.handle_websocket, host, ws_port, max_size=2**24), tcp_server:
+                await asyncio.Future()
+        finally:
+            flusher.cancel()
+            await self.flush()
+
+
+async def report_throughput(receiver: FeedReceiver, every_secs=5.0):
+    """
+    Prints the receive rate of a running receiver.
+
+    Args:
+        receiver (FeedReceiver): Receiver to monitor.
+        every_secs (float, optional): Reporting period. Defaults to 5 seconds.
+    """
+    last_count, last_time = receiver.received, time.perf_counter()
+    while True:
+        await asyncio.sleep(every_secs)
+        count, now = receiver.received, time.perf_counter()
+        print(f"{(count - last_count) / (now - last_time):,.0f} updates/s ({count:,} total, {receiver.rejected:,} malformed)")
+        last_count, last_time = count, now
+
+
+async def main(args):
+    # connectors registered with coordinates only are placed in their LGA and postcode
+    sink = StatusCountSink(fill_site_regions(read_table(args.connectors_path)), args.output_dir, args.freq)
+    receiver = FeedReceiver(sink)
+    monitor = asyncio.create_task(report_throughput(receiver))
+    try:
+        await receiver.serve(args.host, args.ws_port, args.tcp_port)
+    finally:
+        monitor.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Receive connector status pushes and feed them to the app.")
+    parser.add_argument("connectors_path", help="CSV/Parquet with connector_id and the site columns, LGA and postcode may be left empty")
+    parser.add_argument("--output-dir", default=ingest_dir)
+    parser.add_argument("--freq", default="1min")
+    parser.add_argument("--host", default=feed_host, help="Interface to bind, 0.0.0.0 for all")
+    parser.add_argument("--ws-port", type=int, default=feed_ws_port)
+    parser.add_argument("--tcp-port", type=int, default=feed_tcp_port)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+#feed_simulator.py
+#import module
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+#import functions
+from pathlib import Path
+from websockets.asyncio.client import connect
+from config import *
+
+# CPO networks replayed by the simulator
+simulated_cpos = [cpo for cpo in cpo_styles if cpo != 'Overall']
+# Likelihood of each raw status in a push
+simulated_statuses = {'Available': 0.55, 'Charging': 0.2, 'Preparing': 0.05, 'Finishing': 0.05,
+                      'Reserved': 0.03, 'Unavailable': 0.05, 'Faulted': 0.04, 'Unknown': 0.03}
+
+
+def synthetic_connectors(sites_per_cpo=250, connectors_per_site=4, lga_name='Albury', state='NSW', postcode='2640', seed=0) -> pd.DataFrame:
+    """
+    Builds a connector table for the simulated CPO networks around an LGA centre.
+
+    Args:
+        sites_per_cpo (int, optional): Sites per CPO. Defaults to 250.
+        connectors_per_site (int, optional): Connectors per site. Defaults to 4.
+        lga_name (str, optional): LGA the sites are placed in. Defaults to 'Albury'.
+        state (str, optional): State of the LGA. Defaults to 'NSW'.
+        postcode (str, optional): Postcode given to the sites. Defaults to '2640'.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: 'connector_id' plus the site columns.
+    """
+    rng = np.random.default_rng(seed)
+    lga_coords = pd.read_csv(Path(__file__).parent / "lga_geogcoord_df.csv").set_index('lga_name')
+    lat, lon = lga_coords.loc[lga_name, ['lat', 'lon']]
+    n_sites = sites_per_cpo * len(simulated_cpos)
+    sites = pd.DataFrame({'cpo_name': np.repeat(simulated_cpos, sites_per_cpo),
+                          'lga_name': lga_name,
+                          'state': state,
+                          'address1': [f"{number} Simulated Street" for number in range(n_sites)],
+                          'address2': lga_name,
+                          'postcode': postcode,
+                          'latitude': lat + rng.normal(0, 0.02, n_sites),
+                          'longitude': lon + rng.normal(0, 0.02, n_sites)})
+    connectors = sites.loc[sites.index.repeat(connectors_per_site)].reset_index(drop=True)
+    connectors.insert(0, 'connector_id', [f"{cpo[:3].upper()}-{i:06d}" for i, cpo in enumerate(connectors['cpo_name'])])
+    return connectors
+
+
+async def simulate_cpo(cpo_name: str, connector_ids: list, uri: str, rate: float, batch_size: int, duration: float, sent: dict, seed=0):
+    """
+    Pushes random connector status updates for one CPO over a WebSocket.
+
+    Args:
+        cpo_name (str): CPO network being replayed.
+        connector_ids (list): Connectors of the network.
+        uri (str): Receiver WebSocket URI.
+        rate (float): Target updates per second.
+        batch_size (int): Updates per message.
+        duration (float): Seconds to run for.
+        sent (dict): Counter of updates sent per CPO, updated in place.
+        seed (int, optional): Random seed. Defaults to 0.
+    """
+    rng = np.random.default_rng(seed)
+    statuses = list(simulated_statuses)
+    weights = list(simulated_statuses.values())
+    sent[cpo_name] = 0
+    async with connect(uri, max_size=2**24) as websocket:
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            timestamp = pd.Timestamp.now(tz='UTC').isoformat()
+            batch = [{'cpo_name': cpo_name, 'connector_id': connector_id, 'timestamp': timestamp, 'status': status}
+                     for connector_id, status in zip(rng.choice(connector_ids, batch_size),
+                                                     rng.choice(statuses, batch_size, p=weights))]
+            await websocket.send(json.dumps(batch))
+            sent[cpo_name] += batch_size
+            # pace to the target rate
+            await asyncio.sleep(max(0.0, (sent[cpo_name] / rate) - (time.perf_counter() - start)))
+
+
+async def main(args):
+    connectors = synthetic_connectors(args.sites_per_cpo, args.connectors_per_site, args.lga_name)
+    connectors.to_csv(args.connectors_path, index=False)
+    print(f"Written {len(connectors)} simulated connectors to {args.connectors_path}")
+    sent = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        simulate_cpo(cpo, connectors.loc[connectors.cpo_name == cpo, 'connector_id'].tolist(),
+                     args.uri, args.rate, args.batch_size, args.duration, sent, seed)
+        for seed, cpo in enumerate(simulated_cpos)
+    ])
+    elapsed = time.perf_counter() - start
+    total = sum(sent.values())
+    print(f"Sent {total:,} updates in {elapsed:.1f}s ({total / elapsed:,.0f} updates/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay synthetic CPO status feeds against the feed receiver.")
+    parser.add_argument("--uri", default=f"ws://localhost:{feed_ws_port}")
+    parser.add_argument("--rate", type=float, default=5000, help="Updates per second per CPO")
+    parser.add_argument("--batch-size", type=int, default=500, help="Updates per WebSocket message")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run for")
+    parser.add_argument("--sites-per-cpo", type=int, default=250)
+    parser.add_argument("--connectors-per-site", type=int, default=4)
+    parser.add_argument("--lga-name", default="Albury")
+    parser.add_argument("--connectors-path", default="simulated_connectors.csv")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+#geometry.py
+#import module
+import json
+import geopandas as gpd
+import shapely
+#import functions
+from config import *
+
+
+def simplify_coverage(geometry: gpd.GeoSeries, tolerance: float) -> gpd.GeoSeries:
+    """
+    Topology-preserving simplification of neighbouring polygons. Shared edges are
+    simplified once, so adjacent postcodes do not gain gaps or overlaps.
+
+    Args:
+        geometry (gpd.GeoSeries): Polygons forming a coverage.
+        tolerance (float): Simplification tolerance in degrees.
+
+    Returns:
+        gpd.GeoSeries: Simplified polygons, rounded to geometry_precision.
+    """
+    simplified = shapely.coverage_simplify(geometry.to_numpy(), tolerance)
+    simplified = shapely.set_precision(simplified, geometry_precision)
+    return gpd.GeoSeries(simplified, index=geometry.index, crs=geometry.crs)
+
+
+class GeometryService:
+    """
+    Postcode polygons for the choropleth map, pre-sliced per LGA.
+
+    The postcodes of each LGA are those overlapping its boundary plus any postcode
+    tagged with the LGA in the status data. Polygons are simplified once per zoom
+    tolerance and each LGA's GeoJSON is built on first use and kept, so map renders
+    only send the selected LGA's geometry and never rebuild it.
+    """
+
+    def __init__(self,
+                 geodf_poa: gpd.GeoDataFrame,
+                 geodf_lga: gpd.GeoDataFrame,
+                 lga_geogcoord_dict: dict,
+                 lga_postcodes: dict = None,
+                 tolerances=geometry_tolerances):
+        self.tolerances = dict(sorted(tolerances.items()))
+        poa = geodf_poa.geometry
+        # simplified polygons per tolerance
+        self.simplified = {tolerance: simplify_coverage(poa, tolerance) for tolerance in set(self.tolerances.values())}
+        # postcodes to draw for each LGA
+        self.lga_postcodes = {}
+        lga_postcodes = lga_postcodes or {}
+        for lga_name in set(lga_geogcoord_dict) | set(lga_postcodes):
+            boundary = self._lga_boundary(geodf_lga, lga_name, lga_geogcoord_dict.get(lga_name))
+            postcodes = set(lga_postcodes.get(lga_name, []))
+            if boundary is not None:
+                candidates = poa.iloc[poa.sindex.query(boundary, predicate='intersects')]
+                # ignore postcodes that only touch the boundary, an area ratio is fine in degrees
+                overlap = shapely.area(shapely.intersection(candidates.to_numpy(), boundary)) / shapely.area(candidates.to_numpy())
+                postcodes |= set(candidates.index[overlap > geometry_min_overlap])
+            self.lga_postcodes[lga_name] = sorted(postcodes & set(poa.index))
+        self._geojson = {}
+
+    @staticmethod
+    def _lga_boundary(geodf_lga, lga_name, centre):
+        # boundary names do not always match the data, e.g. 'Bathurst Regional' is 'Bathurst'
+        if lga_name in geodf_lga.index:
+            return geodf_lga.geometry.loc[[lga_name]].union_all()
+        if centre is None:
+            return None
+        matches = geodf_lga.sindex.query(shapely.Point(centre['lon'], centre['lat']), predicate='intersects')
+        return geodf_lga.geometry.iloc[matches].union_all() if len(matches) else None
+
+    def tolerance(self, zoom: float) -> float:
+        """
+        Simplification tolerance for a map zoom, from the closest configured zoom at or below it.
+
+        Args:
+            zoom (float): Mapbox zoom level.
+
+        Returns:
+            float: Tolerance in degrees.
+        """
+        levels = [level for level in self.tolerances if level <= zoom] or [min(self.tolerances)]
+        return self.tolerances[max(levels)]
+
+    def geojson(self, lga_name: str, zoom: float = 8) -> dict:
+        """
+        GeoJSON FeatureCollection of the LGA's postcodes, with the postcode as feature id.
+
+        Args:
+            lga_name (str): Local government area.
+            zoom (float, optional): Map zoom the geometry is drawn at. Defaults to 8.
+
+        Returns:
+            dict: Cached GeoJSON, shared between renders and sessions. Do not modify.
+        """
+        key = (lga_name, self.tolerance(zoom))
+        if key not in self._geojson:
+            geometry = self.simplified[key[1]].loc[self.lga_postcodes.get(lga_name, [])]
+            self._geojson[key] = json.loads(gpd.GeoDataFrame(geometry=geometry).to_json(drop_id=False))
+        return self._geojson[key]
+
+    def payload_bytes(self, lga_name: str, zoom: float = 8) -> int:
+        """
+        Serialised size of an LGA's GeoJSON in bytes.
+
+        Args:
+            lga_name (str): Local government area.
+            zoom (float, optional): Map zoom. Defaults to 8.
+
+        Returns:
+            int: Size of the GeoJSON text.
+        """
+        return len(json.dumps(self.geojson(lga_name, zoom), separators=(',', ':')))
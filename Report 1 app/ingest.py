@@ -0,0 +1,134 @@
+#ingest.py
+#import module
+import shutil
+import threading
+import pandas as pd
+#import functions
+from pathlib import Path
+from data_store import apply_status_schema, read_status_csv, read_status_parquet, to_wide_status
+from utilities import convert_dataframe_timezone
+from rollup import rebuild_rollup_partitions
+from uptime_sketch import rebuild_uptime_sketches
+from result_cache import process_data_cache, figure_cache
+
+# Serialises ingests, readers are never blocked
+ingest_lock = threading.Lock()
+
+
+def prepare_observations(new_rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Brings newly received status observations into the loaded data's schema.
+
+    Args:
+        new_rows (pd.DataFrame): Long-format observations with the final_processed_data.csv columns.
+
+    Returns:
+        pd.DataFrame: Typed wide observations with the interval in each state's timezone.
+    """
+    return convert_dataframe_timezone(to_wide_status(apply_status_schema(new_rows)), 'interval', 'state')
+
+
+def ingest_observations(new_rows: pd.DataFrame,
+                        store,
+                        rollup_cube: dict = None,
+                        caches: list = None,
+                        outage_detector=None,
+                        uptime_sketches: dict = None) -> list:
+    """
+    Appends new status intervals to the loaded store without a reload. Only the
+    LGA and month partitions that receive rows are rebuilt in the store and the
+    rollup cube and the uptime sketches, and only cached results and figures for
+    those LGAs are dropped. The outage detector, if given, is extended with the
+    new intervals.
+
+    Safe to call while sessions are live: partitions are replaced, never modified
+    in place, so a running query keeps the version it started with.
+
+    Args:
+        new_rows (pd.DataFrame): Long-format observations with the final_processed_data.csv columns.
+        store (PartitionIndex | StatusWarehouse): Store of the observations.
+        rollup_cube (dict, optional): Rollup cube to keep in step, rebuilt from an in-memory store. Defaults to None.
+        caches (list, optional): ResultCache objects keyed by LGA first. Defaults to the process_data and figure caches.
+        outage_detector (OutageDetector, optional): Outage detector to keep in step. Defaults to None.
+        uptime_sketches (dict, optional): Uptime sketches to keep in step. Defaults to None.
+
+    Returns:
+        list: (lga_name, month) partitions that changed.
+    """
+    if new_rows.empty:
+        return []
+    caches = caches if caches is not None else [process_data_cache, figure_cache]
+    new_rows = prepare_observations(new_rows)
+    with ingest_lock:
+        affected = store.append(new_rows)
+        if rollup_cube is not None:
+            rebuild_rollup_partitions(rollup_cube, store, affected)
+        if uptime_sketches is not None:
+            rebuild_uptime_sketches(uptime_sketches, store, affected)
+        affected_lgas = {lga_name for lga_name, _ in affected}
+        for cache in caches:
+            cache.invalidate(lambda key: key[0] in affected_lgas)
+        if outage_detector is not None:
+            outage_detector.update(new_rows)
+    return affected
+
+
+def ingest_directory(directory, store, rollup_cube: dict = None, caches: list = None, outage_detector=None,
+                     uptime_sketches: dict = None) -> list:
+    """
+    Ingests every CSV or Parquet file dropped into a directory, then moves each
+    file to a 'processed' subdirectory.
+
+    Args:
+        directory (str | Path): Directory receiving new observation files.
+        store (PartitionIndex | StatusWarehouse): Store of the observations.
+        rollup_cube (dict, optional): Rollup cube to keep in step, rebuilt from an in-memory store. Defaults to None.
+        caches (list, optional): ResultCache objects keyed by LGA first. Defaults to the process_data and figure caches.
+        outage_detector (OutageDetector, optional): Outage detector to keep in step. Defaults to None.
+        uptime_sketches (dict, optional): Uptime sketches to keep in step. Defaults to None.
+
+    Returns:
+        list: (lga_name, month) partitions that changed.
+    """
+    directory = Path(directory)
+    processed_dir = directory / "processed"
+    affected = []
+    for path in observation_files(directory):
+        affected += ingest_observations(read_observation_file(path), store, rollup_cube, caches, outage_detector, uptime_sketches)
+        processed_dir.mkdir(exist_ok=True)
+        shutil.move(path, processed_dir / path.name)
+    return affected
+
+
+def replay_processed(directory, store, rollup_cube: dict = None, outage_detector=None, uptime_sketches: dict = None) -> list:
+    """
+    Ingests the files already moved to the 'processed' subdirectory, in one batch, so
+    observations received before a restart are back in an in-memory store. The
+    warehouse writes ingested rows to its own files and does not need this.
+
+    Args:
+        directory (str | Path): Directory receiving new observation files.
+        store (PartitionIndex): Store of the observations.
+        rollup_cube (dict, optional): Rollup cube to keep in step. Defaults to None.
+        outage_detector (OutageDetector, optional): Outage detector to keep in step. Defaults to None.
+        uptime_sketches (dict, optional): Uptime sketches to keep in step. Defaults to None.
+
+    Returns:
+        list: (lga_name, month) partitions that changed.
+    """
+    paths = observation_files(Path(directory) / "processed")
+    if not paths:
+        return []
+    new_rows = pd.concat([read_observation_file(path) for path in paths], ignore_index=True)
+    affected = ingest_observations(new_rows, store, rollup_cube, [], outage_detector, uptime_sketches)
+    print(f"Replayed {len(new_rows)} observations from {len(paths)} processed files")
+    return affected
+
+
+def observation_files(directory: Path) -> list:
+    # CSV then Parquet, each in name order so feed files follow their time windows
+    return sorted(directory.glob("*.csv")) + sorted(directory.glob("*.parquet"))
+
+
+def read_observation_file(path: Path) -> pd.DataFrame:
+    return read_status_parquet(path) if path.suffix == '.parquet' else read_status_csv(path)
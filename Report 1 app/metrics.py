@@ -0,0 +1,170 @@
+#metrics.py
+#import module
+import bisect
+import cProfile
+import threading
+import time
+#import functions
+from contextlib import contextmanager
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from config import *
+from result_cache import process_data_cache, figure_cache
+
+
+class Stage:
+    """
+    Measurement of one stage run. Set rows and bytes inside the timed block.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+
+class NullStage(Stage):
+    """
+    Stand-in handed out when metrics are disabled, values set on it are discarded.
+    """
+    enabled = False
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms with rows and bytes counters, exposed in the
+    Prometheus text format.
+
+    When a profile threshold is set, the outermost stage of each thread runs
+    under cProfile. Its stats are only written to profile_dir when the stage is
+    slower than the threshold.
+    """
+
+    def __init__(self, buckets=metrics_buckets, enabled=metrics_enabled, profile_slow_secs=profile_slow_secs):
+        self.buckets = list(buckets)
+        # profiling slow stages needs the stages timed
+        self.enabled = enabled or profile_slow_secs is not None
+        self.profile_slow_secs = profile_slow_secs
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, stage: str, seconds: float, rows=0, nbytes=0):
+        """
+        Records one run of a stage.
+
+        Args:
+            stage (str): Stage name, e.g. 'compute.process_data'.
+            seconds (float): Duration.
+            rows (int, optional): Rows processed. Defaults to 0.
+            nbytes (int, optional): Bytes emitted. Defaults to 0.
+        """
+        with self._lock:
+            counts = self._stages.setdefault(stage, {'buckets': [0] * (len(self.buckets) + 1),
+                                                     'sum': 0.0, 'count': 0, 'rows': 0, 'bytes': 0})
+            counts['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            counts['sum'] += seconds
+            counts['count'] += 1
+            counts['rows'] += rows
+            counts['bytes'] += nbytes
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        Times the enclosed block as a stage.
+
+        Args:
+            stage (str): Stage name.
+
+        Yields:
+            Stage: Set its rows and bytes inside the block.
+        """
+        if not self.enabled:
+            yield null_stage
+            return
+        measurement = Stage()
+        profiler = None
+        depth = getattr(self._local, 'depth', 0)
+        if self.profile_slow_secs is not None and depth == 0:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process
+                profiler = None
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            seconds = time.perf_counter() - start
+            self._local.depth = depth
+            self.observe(stage, seconds, measurement.rows, measurement.bytes)
+            if profiler is not None:
+                profiler.disable()
+                if seconds >= self.profile_slow_secs:
+                    self.save_profile(profiler, stage, seconds)
+
+    @staticmethod
+    def save_profile(profiler: cProfile.Profile, stage: str, seconds: float):
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        path = profile_dir / f"{stage}_{time.strftime('%Y%m%dT%H%M%S')}_{int(seconds * 1000)}ms.prof"
+        profiler.dump_stats(path)
+        print(f"Slow {stage} ({seconds:.2f}s), profile written to {path}")
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: Copy of the counters per stage.
+        """
+        with self._lock:
+            return {stage: dict(counts, buckets=list(counts['buckets'])) for stage, counts in self._stages.items()}
+
+    def prometheus_text(self, extra_counters: dict = None, extra_gauges: dict = None) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Args:
+            extra_counters (dict, optional): Further counters, name without the '_total' suffix to value.
+            extra_gauges (dict, optional): Further gauges, name to value.
+
+        Returns:
+            str: Exposition text.
+        """
+        lines = ["# HELP dashboard_stage_seconds Latency of a dashboard stage.",
+                 "# TYPE dashboard_stage_seconds histogram"]
+        stages = self.snapshot()
+        for stage, counts in stages.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], counts['buckets']):
+                cumulative += count
+                lines.append(f'dashboard_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'dashboard_stage_seconds_sum{{stage="{stage}"}} {counts["sum"]}')
+            lines.append(f'dashboard_stage_seconds_count{{stage="{stage}"}} {counts["count"]}')
+        for name, help_text in [('rows', 'Rows processed by a dashboard stage.'), ('bytes', 'Bytes emitted by a dashboard stage.')]:
+            lines += [f"# HELP dashboard_stage_{name}_total {help_text}", f"# TYPE dashboard_stage_{name}_total counter"]
+            lines += [f'dashboard_stage_{name}_total{{stage="{stage}"}} {counts[name]}' for stage, counts in stages.items()]
+        for name, value in (extra_counters or {}).items():
+            lines += [f"# TYPE {name}_total counter", f"{name}_total {value}"]
+        for name, value in (extra_gauges or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+null_stage = NullStage()
+# Shared by every session and worker thread of the process
+stage_metrics = StageMetrics()
+
+
+# Cache statistics that only ever increase, exported as counters, the rest are gauges
+cache_counter_names = ['hits', 'misses', 'evictions', 'invalidations']
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    cache_stats = {f"dashboard_{cache_name}_{name}": (name, value)
+                   for cache_name, cache in [('result_cache', process_data_cache), ('figure_cache', figure_cache)]
+                   for name, value in cache.stats().items()}
+    cache_counters = {metric: value for metric, (name, value) in cache_stats.items() if name in cache_counter_names}
+    cache_gauges = {metric: value for metric, (name, value) in cache_stats.items() if name not in cache_counter_names}
+    return PlainTextResponse(stage_metrics.prometheus_text(cache_counters, cache_gauges),
+                             media_type="text/plain; version=0.0.4")
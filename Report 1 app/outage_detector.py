@@ -0,0 +1,185 @@
+#outage_detector.py
+#import module
+import threading
+import numpy as np
+import pandas as pd
+#import functions
+from config import *
+from status_events import site_cols
+
+# Columns of the outage tables
+outage_cols = site_cols + ['status', 'start', 'last_seen', 'duration', 'ports', 'Total', 'active']
+
+
+class OutageDetector:
+    """
+    Incremental detector of sustained outages in the wide status observations.
+
+    A site is in an outage run of a status while at least one of its ports
+    reports that status. A run ends when an interval has no port in the status,
+    or when the site is not observed for longer than max_gap. Runs lasting at
+    least the status's minimum duration are flagged as outages. The counts do not
+    say which port is down, so 'ports' is the fewest ports in the status at any
+    interval of the run, the ports that were down throughout at the least.
+    A run lasts from the start of its first interval to the end of its last, so
+    a single interval in the status lasts one interval length.
+
+    Only the open run of each site and status and the flagged outages are kept,
+    so each batch is processed in time proportional to the batch, not the history.
+    Intervals a site has already been observed at are ignored.
+    """
+
+    def __init__(self, min_durations=outage_min_durations, max_gap=outage_max_gap, interval=outage_interval,
+                 key_cols=site_cols, time_col='interval'):
+        self.min_durations = {status: pd.Timedelta(duration).value for status, duration in min_durations.items()}
+        self.statuses = list(self.min_durations)
+        self.max_gap = pd.Timedelta(max_gap).value
+        self.interval = pd.Timedelta(interval).value
+        self.key_cols = key_cols
+        self.time_col = time_col
+        # site key to site id, and the last interval observed per site id
+        self.site_ids = {}
+        self.sites = []
+        self.last_seen = np.empty(0, dtype='int64')
+        # open run per site and status, ends in ns since the epoch
+        self.open_runs = pd.DataFrame({'site_id': np.empty(0, 'int64'), 'status': np.empty(0, 'int64'),
+                                       'start': np.empty(0, 'int64'), 'last_seen': np.empty(0, 'int64'),
+                                       'ports': np.empty(0, 'int64'), 'Total': np.empty(0, 'int64')})
+        self.closed_runs = []
+        self._lock = threading.Lock()
+
+    def _site_ids(self, keys: pd.DataFrame) -> np.ndarray:
+        # one dictionary lookup per distinct site of the batch
+        codes, uniques = pd.MultiIndex.from_frame(keys).factorize()
+        ids = np.empty(len(uniques), dtype='int64')
+        for position, key in enumerate(uniques):
+            key = tuple(None if pd.isna(value) else value for value in key)
+            if key not in self.site_ids:
+                self.site_ids[key] = len(self.sites)
+                self.sites.append(key)
+            ids[position] = self.site_ids[key]
+        if len(self.sites) > len(self.last_seen):
+            self.last_seen = np.concatenate([self.last_seen, np.full(len(self.sites) - len(self.last_seen), np.iinfo('int64').min)])
+        return ids[codes]
+
+    def update(self, observations: pd.DataFrame) -> int:
+        """
+        Extends the runs with a batch of observations.
+
+        Args:
+            observations (pd.DataFrame): Wide status observations with the key columns,
+                the time column, 'Total' and the detector's statuses.
+
+        Returns:
+            int: Number of outages flagged or extended by the batch.
+        """
+        if observations.empty:
+            return 0
+        with self._lock:
+            site_id = self._site_ids(observations[self.key_cols])
+            times = pd.DatetimeIndex(observations[self.time_col]).tz_convert('UTC').asi8
+            fresh = times > self.last_seen[site_id]
+            site_id, times = site_id[fresh], times[fresh]
+            if len(site_id) == 0:
+                return 0
+            np.maximum.at(self.last_seen, site_id, times)
+            n_rows = len(site_id)
+            # long layout, one row per site, status and interval
+            batch = pd.DataFrame({'site_id': np.tile(site_id, len(self.statuses)),
+                                  'status': np.repeat(np.arange(len(self.statuses)), n_rows),
+                                  'start': np.tile(times, len(self.statuses)),
+                                  'last_seen': np.tile(times, len(self.statuses)),
+                                  'ports': np.concatenate([observations[status].to_numpy('int64', na_value=0)[fresh]
+                                                           for status in self.statuses]),
+                                  'Total': np.tile(observations['Total'].to_numpy('int64', na_value=0)[fresh], len(self.statuses))})
+            # open runs of the batch's sites go first as one row each, the rest stay open
+            carried = self.open_runs['site_id'].isin(np.unique(site_id)).to_numpy()
+            batch = pd.concat([self.open_runs.loc[carried], batch], ignore_index=True)
+            self.open_runs = self.open_runs.loc[~carried]
+            batch = batch.sort_values(['site_id', 'status', 'last_seen'], kind='stable', ignore_index=True)
+
+            group = batch['site_id'].to_numpy() * len(self.statuses) + batch['status'].to_numpy()
+            time = batch['last_seen'].to_numpy()
+            down = batch['ports'].to_numpy() > 0
+            new_group = np.r_[True, group[1:] != group[:-1]]
+            gap = np.r_[True, time[1:] - time[:-1] > self.max_gap]
+            previous_down = np.r_[False, down[:-1]]
+            run_start = down & (new_group | gap | ~previous_down)
+            run = np.cumsum(run_start)
+            last_row = np.r_[new_group[1:], True]
+            runs = (batch.loc[down]
+                    .assign(run=run[down], open=last_row[down])
+                    .groupby('run', sort=False)
+                    .agg(site_id=('site_id', 'first'), status=('status', 'first'), start=('start', 'first'),
+                         last_seen=('last_seen', 'last'), ports=('ports', 'min'), Total=('Total', 'max'), open=('open', 'last')))
+            open_runs = runs['open'].to_numpy(bool)
+            self.open_runs = pd.concat([self.open_runs, runs.loc[open_runs].drop(columns='open')], ignore_index=True)
+            closed = runs.loc[~open_runs].drop(columns='open')
+            closed = closed.loc[self._flagged(closed)]
+            if not closed.empty:
+                self.closed_runs.append(closed)
+            return len(closed) + int(self._flagged(runs.loc[open_runs]).sum())
+
+    def _duration(self, runs: pd.DataFrame) -> np.ndarray:
+        # 'last_seen' is the start of the run's last interval
+        return (runs['last_seen'] - runs['start']).to_numpy('int64') + self.interval
+
+    def _flagged(self, runs: pd.DataFrame) -> np.ndarray:
+        min_duration = np.array(list(self.min_durations.values()))[runs['status'].to_numpy('int64')]
+        return self._duration(runs) >= min_duration
+
+    def _table(self, runs: pd.DataFrame, active: bool) -> pd.DataFrame:
+        sites = pd.DataFrame([self.sites[site_id] for site_id in runs['site_id']], columns=self.key_cols)
+        return sites.assign(status=np.array(self.statuses)[runs['status'].to_numpy('int64')],
+                            start=pd.to_datetime(runs['start'].to_numpy(), utc=True),
+                            last_seen=pd.to_datetime(runs['last_seen'].to_numpy(), utc=True),
+                            duration=pd.to_timedelta(self._duration(runs)),
+                            ports=runs['ports'].to_numpy(),
+                            Total=runs['Total'].to_numpy(),
+                            active=active)
+
+    def outages(self, active_only=False) -> pd.DataFrame:
+        """
+        Args:
+            active_only (bool, optional): Only the outages still running. Defaults to False.
+
+        Returns:
+            pd.DataFrame: Flagged outages with UTC 'start' and 'last_seen', the active ones first,
+                then the longest first.
+        """
+        with self._lock:
+            active = self.open_runs.loc[self._flagged(self.open_runs)]
+            tables = [self._table(active, True)]
+            if not active_only:
+                tables += [self._table(closed, False) for closed in self.closed_runs]
+        outages = pd.concat(tables, ignore_index=True)[outage_cols]
+        return outages.sort_values(['active', 'duration'], ascending=False, ignore_index=True)
+
+
+def lga_outages(outages: pd.DataFrame, lga_name: str, cpo_selected: list, start_date: pd.Timestamp, end_date: pd.Timestamp) -> pd.DataFrame:
+    """
+    Outages of the selected CPOs in one LGA that overlap the period, for display.
+
+    Args:
+        outages (pd.DataFrame): Table of OutageDetector.outages.
+        lga_name (str): Local government area.
+        cpo_selected (list): Selected charge point operators.
+        start_date (pd.Timestamp): Start of the period (tz-aware).
+        end_date (pd.Timestamp): End of the period (tz-aware).
+
+    Returns:
+        pd.DataFrame: One row per outage with local start and last seen times and the duration in hours.
+    """
+    outages = outages.loc[(outages['lga_name'] == lga_name)
+                          & outages['cpo_name'].isin(cpo_selected)
+                          & (outages['last_seen'] >= start_date)
+                          & (outages['start'] <= end_date)]
+    tz = timezone_mappings.get(outages['state'].iloc[0], pytz.UTC) if not outages.empty else pytz.UTC
+    return pd.DataFrame({'CPO': outages['cpo_name'],
+                         'Site': outages['address1'].astype(str) + ", " + outages['address2'].astype(str),
+                         'Status': outages['status'],
+                         'Since': outages['start'].dt.tz_convert(tz).dt.strftime('%d %b %H:%M'),
+                         'Last seen': outages['last_seen'].dt.tz_convert(tz).dt.strftime('%d %b %H:%M'),
+                         'Hours': (outages['duration'] / pd.Timedelta(hours=1)).round(1),
+                         'Ports': outages['ports'].astype(str) + " of " + outages['Total'].astype(str),
+                         'Active': outages['active'].map({True: 'Yes', False: 'No'})})
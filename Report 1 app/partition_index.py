@@ -0,0 +1,186 @@
+#partition_index.py
+#import module
+import numpy as np
+import pandas as pd
+#import functions
+from config import *
+from data_store import status_value_cols
+
+
+def partition_month(df: pd.DataFrame, time_col='interval') -> pd.Series:
+    """
+    Local calendar month of each row, used as the partition key.
+
+    Args:
+        df (pd.DataFrame): Timezone converted observations, with the local time column
+            of mixed timezone data when present.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+    Returns:
+        pd.Series: Monthly periods.
+    """
+    local_col = f"{time_col}_local"
+    intervals = df[local_col] if local_col in df.columns else df[time_col].dt.tz_localize(None)
+    return intervals.dt.to_period('M')
+
+
+def local_partition(partition: pd.DataFrame, time_col='interval', state_col='state') -> pd.DataFrame:
+    """
+    Rows of one LGA with the time column in the LGA's timezone, so resampling them
+    bins by local time. An LGA lies in one state, the first row's state gives the
+    timezone. Only the column's timezone changes, the data is not copied.
+
+    Args:
+        partition (pd.DataFrame): Timezone converted observations of one LGA.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+        state_col (str, optional): Name of the state column. Defaults to 'state'.
+
+    Returns:
+        pd.DataFrame: The rows with a local time column, without the separate local time column of mixed timezone data.
+    """
+    tz = timezone_mappings.get(partition[state_col].iloc[0], pytz.UTC) if len(partition) else pytz.UTC
+    partition = partition.copy(deep=False)
+    partition[time_col] = partition[time_col].dt.tz_convert(tz)
+    if f"{time_col}_local" in partition.columns:
+        del partition[f"{time_col}_local"]
+    return partition
+
+
+def align_categories(frames: list) -> list:
+    """
+    Gives the categorical columns of several frames the same (sorted) categories,
+    so concatenating them keeps the columns categorical.
+
+    Args:
+        frames (list): DataFrames with the same columns.
+
+    Returns:
+        list: The frames with unioned categories.
+    """
+    cat_cols = [col for col in frames[0].columns if isinstance(frames[0][col].dtype, pd.CategoricalDtype)]
+    for col in cat_cols:
+        categories = sorted(set().union(*(frame[col].cat.categories for frame in frames)))
+        frames = [frame.assign(**{col: frame[col].cat.set_categories(categories)}) for frame in frames]
+    return frames
+
+
+class PartitionIndex:
+    """
+    Status observations split into partitions keyed by LGA and month, each sorted
+    by interval.
+
+    A selection only visits the partitions of the selected LGA that overlap the
+    period and binary searches their sorted intervals, so filtering scales with
+    the selection instead of the whole dataset. The initial partitions are slices
+    of one sorted frame (`data`) and do not copy it. Each partition holds its
+    intervals in the LGA's timezone, `data` may hold UTC when the states span
+    several. Appends replace only the affected partitions, and readers holding an
+    older partition are unaffected.
+    """
+
+    def __init__(self, df: pd.DataFrame, time_col='interval', lga_col='lga_name'):
+        self.time_col = time_col
+        self.lga_col = lga_col
+        self.data = df.sort_values([lga_col, time_col], kind='stable', ignore_index=True)
+        # {lga_name: {month: (rows, interval as UTC nanoseconds)}}
+        self._partitions = {}
+        months = partition_month(self.data, time_col)
+        for (lga_name, month), rows in self.data.groupby([self.data[lga_col], months], observed=True, sort=False).indices.items():
+            self._set_partition(lga_name, month, self.data.iloc[rows[0]:rows[-1] + 1])
+
+    def _set_partition(self, lga_name, month, partition: pd.DataFrame):
+        lga_partitions = dict(self._partitions.get(lga_name, {}))
+        partition = local_partition(partition, self.time_col)
+        lga_partitions[month] = (partition, partition[self.time_col].array.as_unit('ns').asi8)
+        # swap the whole per-LGA dictionary so concurrent readers see a consistent state
+        self._partitions[lga_name] = dict(sorted(lga_partitions.items()))
+
+    def lga_names(self) -> list:
+        """
+        Returns:
+            list: LGAs present in the index.
+        """
+        return list(self._partitions)
+
+    def months(self, lga_name: str) -> list:
+        """
+        Args:
+            lga_name (str): Local government area.
+
+        Returns:
+            list: Months with a partition for the LGA, in order.
+        """
+        return list(self._partitions.get(lga_name, {}))
+
+    def partition(self, lga_name: str, month: pd.Period) -> pd.DataFrame:
+        """
+        All rows of one LGA and month, sorted by interval.
+
+        Args:
+            lga_name (str): Local government area.
+            month (pd.Period): Local calendar month.
+
+        Returns:
+            pd.DataFrame | None: Rows of the partition, or None when it does not exist.
+        """
+        partition, _ = self._partitions.get(lga_name, {}).get(month, (None, None))
+        return partition
+
+    def select(self,
+               lga_name: str,
+               cpo_selected: list,
+               start_date: pd.Timestamp,
+               end_date: pd.Timestamp) -> pd.DataFrame:
+        """
+        Rows for one LGA, a set of CPOs and the period [start_date, end_date).
+
+        Args:
+            lga_name (str): Local government area.
+            cpo_selected (list): Selected charge point operators.
+            start_date (pd.Timestamp): Inclusive start of the period (tz-aware).
+            end_date (pd.Timestamp): Exclusive end of the period (tz-aware).
+
+        Returns:
+            pd.DataFrame: Filtered status observations.
+        """
+        bounds = [pd.Timestamp(start_date).as_unit('ns').value, pd.Timestamp(end_date).as_unit('ns').value]
+        selected = []
+        for partition, times in self._partitions.get(lga_name, {}).values():
+            if len(times) == 0 or times[-1] < bounds[0] or times[0] >= bounds[1]:
+                continue
+            lo, hi = np.searchsorted(times, bounds)
+            rows = partition.iloc[lo:hi]
+            selected.append(rows.loc[rows['cpo_name'].isin(cpo_selected)])
+        if not selected:
+            return self.data.iloc[0:0]
+        if len(selected) == 1:
+            return selected[0]
+        return pd.concat(align_categories(selected), ignore_index=True)
+
+    def append(self, new_rows: pd.DataFrame, key_cols=None) -> list:
+        """
+        Adds new observations, replacing rows that share a key with an incoming row.
+        Only the LGA and month partitions that receive rows are rebuilt.
+
+        Args:
+            new_rows (pd.DataFrame): Typed, timezone converted status observations.
+            key_cols (list, optional): Columns identifying an observation. Defaults to
+                every column except 'value', the status count columns and the local time column.
+
+        Returns:
+            list: (lga_name, month) partitions that changed.
+        """
+        key_cols = key_cols or [col for col in new_rows.columns if col not in status_value_cols + ['value', f"{self.time_col}_local"]]
+        months = partition_month(new_rows, self.time_col)
+        affected = []
+        for (lga_name, month), rows in new_rows.groupby([new_rows[self.lga_col], months], observed=True).indices.items():
+            incoming = local_partition(new_rows.iloc[rows], self.time_col)
+            current = self.partition(lga_name, month)
+            if current is not None:
+                incoming = pd.concat(align_categories([current, incoming]), ignore_index=True)
+            partition = (incoming
+                         .drop_duplicates(subset=key_cols, keep='last')
+                         .sort_values(self.time_col, kind='stable', ignore_index=True))
+            self._set_partition(lga_name, month, partition)
+            affected.append((lga_name, month))
+        return affected
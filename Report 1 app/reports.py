@@ -0,0 +1,185 @@
+#reports.py
+#import module
+import argparse
+import time
+import warnings
+import pandas as pd
+#import functions
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from great_tables import GT
+from config import *
+from utilities import convert_dataframe_timezone, process_data, cpo_kpis
+from data_store import read_status_csv, read_status_parquet, to_wide_status
+from warehouse import StatusWarehouse, open_warehouse
+
+# Column labels of the report tables
+kpi_labels = {'cpo_name': 'CPO',
+              'evse_count': 'Chargers',
+              'average_uptime': 'Average uptime (%)',
+              'minimum_uptime': 'Minimum uptime (%)',
+              'average_utilisation': 'Average utilisation (%)',
+              'maximum_unavailability': 'Maximum unavailability (%)',
+              'average_unavailability': 'Average unavailability (%)'}
+
+# Warehouse of each worker process, opened by the pool initializer
+worker_warehouse = None
+
+
+def open_worker_warehouse(directory):
+    global worker_warehouse
+    # one DuckDB thread per process, the pool provides the parallelism
+    worker_warehouse = StatusWarehouse(directory, threads=1)
+
+
+def lga_report(lga_name: str, state: str, cpos: list, observations: pd.DataFrame, month: pd.Period, interval_option: str) -> pd.DataFrame:
+    """
+    KPIs of every CPO in one LGA for one month, as shown in the dashboard's value boxes.
+    Runs in a worker process.
+
+    Args:
+        lga_name (str): Local government area.
+        state (str): State of the LGA.
+        cpos (list): CPOs with sites in the LGA.
+        observations (pd.DataFrame | None): Wide observations of the LGA, or None to query the worker's warehouse.
+        month (pd.Period): Reported month, in the LGA's local time.
+        interval_option (str): Interval the statistics are computed over, e.g. '60min'.
+
+    Returns:
+        pd.DataFrame: One row per CPO.
+    """
+    # a day either side of the month covers the offset between UTC and local time
+    start_date = (month.start_time - pd.Timedelta(days=1)).tz_localize('UTC')
+    end_date = (month.end_time + pd.Timedelta(days=1)).tz_localize('UTC')
+    if observations is None:
+        data_list = worker_warehouse.process_data_grouping_sets(lga_name, cpos, start_date, end_date,
+                                                                [agg_levels['cpo']], interval_option, combine_cols=True)
+        if data_list is None:
+            return None
+        cpo_data = data_list[0]
+    else:
+        cpo_data = process_data(convert_dataframe_timezone(observations, 'interval', 'state'),
+                                agg_levels['cpo'], interval_option, combine_cols=True)
+    # keep the intervals within the local month
+    month_start = month.start_time.tz_localize(cpo_data['interval'].dt.tz)
+    month_end = (month + 1).start_time.tz_localize(cpo_data['interval'].dt.tz)
+    cpo_data = cpo_data.loc[(cpo_data['interval'] >= month_start) & (cpo_data['interval'] < month_end)]
+    if cpo_data.empty:
+        return None
+    return cpo_kpis(cpo_data).reset_index().assign(state=state, lga_name=lga_name)
+
+
+def report_tasks(month: pd.Period, data_path=None, warehouse=None):
+    """
+    Arguments of lga_report for every LGA with observations in the month.
+    Only the month's rows are read, and each LGA's rows are sent to a single worker.
+
+    Args:
+        month (pd.Period): Reported month.
+        data_path (str | Path, optional): Long-format Parquet or CSV, used without a warehouse.
+        warehouse (StatusWarehouse, optional): Warehouse holding the observations.
+
+    Yields:
+        tuple: (lga_name, state, cpos, observations or None).
+    """
+    start_date = (month.start_time - pd.Timedelta(days=1)).tz_localize('UTC')
+    end_date = (month.end_time + pd.Timedelta(days=1)).tz_localize('UTC')
+    if warehouse is not None:
+        site_months = warehouse.site_months()
+        site_months = site_months.loc[(site_months['interval'] >= start_date) & (site_months['interval'] < end_date)]
+        for lga_name, sites in site_months.groupby('lga_name', observed=True):
+            yield lga_name, sites['state'].iloc[0], list(sites['cpo_name'].unique()), None
+        return
+    data_path = Path(data_path)
+    if data_path.suffix == '.parquet':
+        observations = read_status_parquet(data_path, filters=[('interval', '>=', start_date), ('interval', '<', end_date)])
+    else:
+        observations = read_status_csv(data_path)
+        observations = observations.loc[(observations['interval'] >= start_date) & (observations['interval'] < end_date)]
+    observations = to_wide_status(observations)
+    for lga_name, lga_rows in observations.groupby('lga_name', observed=True):
+        # drop the other LGAs' categories so only this LGA's rows are pickled to the worker
+        lga_rows = lga_rows.reset_index(drop=True)
+        for col in lga_rows.select_dtypes('category').columns:
+            lga_rows[col] = lga_rows[col].cat.remove_unused_categories()
+        yield lga_name, lga_rows['state'].iloc[0], list(lga_rows['cpo_name'].unique()), lga_rows
+
+
+def report_table(kpis: pd.DataFrame, title: str, subtitle: str) -> GT:
+    """
+    Args:
+        kpis (pd.DataFrame): Rows of generate_reports for one state.
+        title (str): Table title.
+        subtitle (str): Table subtitle.
+
+    Returns:
+        GT: KPI table grouped by LGA.
+    """
+    return (GT(kpis[['lga_name'] + list(kpi_labels)], rowname_col='cpo_name', groupname_col='lga_name')
+            .tab_header(title=title, subtitle=subtitle)
+            .cols_label(**{col: label for col, label in kpi_labels.items() if col != 'cpo_name'})
+            .fmt_number(columns=[col for col in kpi_labels if col not in ('cpo_name', 'evse_count')], decimals=1)
+            .fmt_integer(columns='evse_count')
+            .sub_missing(missing_text='-'))
+
+
+def generate_reports(month,
+                     data_path=Path(__file__).parent / "final_processed_data.parquet",
+                     output_dir=report_dir,
+                     interval_option=report_interval,
+                     max_workers=report_workers) -> pd.DataFrame:
+    """
+    Generates the monthly uptime and utilisation report of every LGA and CPO.
+
+    LGAs are processed in parallel in a process pool. The warehouse is used when
+    one has been built, otherwise the month's rows are read from data_path.
+    Writes 'uptime_utilisation.parquet' with every row and one HTML table per
+    state to output_dir/<month>.
+
+    Args:
+        month (str | pd.Period): Reported month, e.g. '2024-03'.
+        data_path (str | Path, optional): Long-format Parquet or CSV. Defaults to final_processed_data.parquet.
+        output_dir (str | Path, optional): Report directory. Defaults to config.report_dir.
+        interval_option (str, optional): Interval the statistics are computed over. Defaults to config.report_interval.
+        max_workers (int, optional): Worker processes. Defaults to config.report_workers.
+
+    Returns:
+        pd.DataFrame: One row per LGA and CPO.
+    """
+    month = pd.Period(month, 'M')
+    warehouse = open_warehouse()
+    pool_args = {'initializer': open_worker_warehouse, 'initargs': (warehouse.directory,)} if warehouse is not None else {}
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_args) as executor:
+        futures = [executor.submit(lga_report, *task, month, interval_option)
+                   for task in report_tasks(month, data_path, warehouse)]
+        reports = [future.result() for future in futures]
+    reports = [report for report in reports if report is not None]
+    if not reports:
+        raise ValueError(f"No observations for {month}")
+    kpis = pd.concat(reports, ignore_index=True)
+    kpis = kpis[['state', 'lga_name'] + list(kpi_labels)].sort_values(['state', 'lga_name', 'cpo_name'], ignore_index=True)
+
+    month_dir = Path(output_dir) / str(month)
+    month_dir.mkdir(parents=True, exist_ok=True)
+    kpis.to_parquet(month_dir / "uptime_utilisation.parquet", index=False)
+    for state, state_kpis in kpis.groupby('state', observed=True):
+        table = report_table(state_kpis,
+                             f"Charger uptime and utilisation, {state}",
+                             f"{month.strftime('%B %Y')}, statistics per {interval_options2.get(interval_option, interval_option)}")
+        (month_dir / f"uptime_utilisation_{state}.html").write_text(table.as_raw_html(), encoding="utf-8")
+    return kpis
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the monthly uptime and utilisation report for every LGA and CPO.")
+    parser.add_argument("month", help="Reported month, e.g. 2024-03")
+    parser.add_argument("--data", default=Path(__file__).parent / "final_processed_data.parquet",
+                        help="Long-format Parquet or CSV, used when no warehouse has been built")
+    parser.add_argument("--output", default=report_dir)
+    parser.add_argument("--interval", default=report_interval, choices=list(interval_options))
+    parser.add_argument("--workers", type=int, default=report_workers)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    start = time.perf_counter()
+    kpis = generate_reports(args.month, args.data, args.output, args.interval, args.workers)
+    print(f"Reported {len(kpis)} LGA and CPO rows for {args.month} in {time.perf_counter() - start:.1f}s")
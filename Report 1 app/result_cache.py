@@ -0,0 +1,170 @@
+#result_cache.py
+#import module
+import sys
+import threading
+import pandas as pd
+#import functions
+from collections import OrderedDict
+from config import *
+
+
+def frame_nbytes(value) -> int:
+    """
+    Approximate in-memory size of a cached value in bytes.
+
+    Args:
+        value (object): Cached value, usually a DataFrame.
+
+    Returns:
+        int: Size in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, (list, tuple)):
+        return sum(frame_nbytes(item) for item in value)
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Process-wide LRU cache shared by every Shiny session on a worker.
+
+    Entries are evicted least recently used first once either the entry count
+    or the total byte size exceeds its limit. invalidate() drops entries when the
+    underlying data is reloaded and bumps data_version. get_or_compute() computes
+    each missing key once however many sessions ask for it at the same time, and
+    does not store a result when the data was invalidated while it was computed.
+    """
+
+    def __init__(self, max_entries=result_cache_max_entries, max_bytes=result_cache_max_bytes, sizeof=frame_nbytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.data_version = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # keys being computed, with the event set once their computation finishes
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key and marks it most recently used.
+
+        Args:
+            key (tuple): Cache key.
+            default (object, optional): Value returned on a miss. Defaults to None.
+
+        Returns:
+            object: Cached value or default.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return self._entries[key][0]
+            self._counters['misses'] += 1
+            return default
+
+    def put(self, key, value, data_version=None):
+        """
+        Stores a value, evicting least recently used entries to stay within the limits.
+        Values larger than max_bytes are not cached.
+
+        Args:
+            key (tuple): Cache key.
+            value (object): Value to cache.
+            data_version (int, optional): Data version the value was computed from, the
+                value is not stored if the cache has been invalidated since. Defaults to None.
+        """
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if data_version is not None and data_version != self.data_version:
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters['evictions'] += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key (tuple): Cache key.
+            compute (callable): Zero-argument function producing the value.
+
+        Returns:
+            object: Cached or freshly computed value.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        while True:
+            with self._lock:
+                # stored by the computation waited on below
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    data_version = self.data_version
+                    break
+            # another session is computing the key, wait for it rather than computing it twice
+            pending.wait()
+        try:
+            value = compute()
+            self.put(key, value, data_version)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+        return value
+
+    def invalidate(self, predicate=None):
+        """
+        Drops cached entries and bumps data_version.
+
+        Args:
+            predicate (callable, optional): Called with each key, entries for which it
+                returns True are dropped. Defaults to dropping every entry.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate is None or predicate(key)]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)[1]
+            self.data_version += 1
+            self._counters['invalidations'] += 1
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the cache counters.
+
+        Returns:
+            dict: hits, misses, evictions, invalidations, hit_rate, entries, bytes and data_version.
+        """
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return self._counters | {'hit_rate': self._counters['hits'] / lookups if lookups else 0.0,
+                                     'entries': len(self._entries),
+                                     'bytes': self._bytes,
+                                     'data_version': self.data_version}
+
+
+# Shared cache of process_data results, keyed by
+# (lga_name, cpo set, start_date, end_date, interval_option, agg_cols)
+process_data_cache = ResultCache()
+# Shared cache of Plotly figure JSON, keyed by the LGA, the figure name, the
+# aggregated selection with its data version, and the figure's own inputs
+figure_cache = ResultCache(figure_cache_max_entries, figure_cache_max_bytes)
@@ -0,0 +1,198 @@
+#rollup.py
+#import module
+import argparse
+import pandas as pd
+#import functions
+from pathlib import Path
+from config import *
+from utilities import pivot_status_data, combine_status_columns, resample_status_data, convert_dataframe_timezone
+from data_store import read_status_csv, read_status_parquet, is_stale
+from partition_index import partition_month, local_partition
+
+# Default location of the prebuilt cube
+rollup_dir = Path(__file__).parent / "rollup_cube"
+# Data files the cube is built from by default
+data_files = [Path(__file__).parent / "final_processed_data.parquet", Path(__file__).parent / "final_processed_data.csv"]
+
+
+def cube_level_cols(agg_cols: list) -> list:
+    """
+    Columns a cube level is stored on. CPO is always kept so a level can be
+    filtered to any CPO selection before it is rolled up.
+
+    Args:
+        agg_cols (list): Aggregation columns of the level.
+
+    Returns:
+        list: Aggregation columns with 'cpo_name' first.
+    """
+    return agg_cols if 'cpo_name' in agg_cols else ['cpo_name'] + agg_cols
+
+
+def build_rollup_cube(df: pd.DataFrame, levels: dict = agg_levels, time_col='interval') -> dict:
+    """
+    Materialises the wide status counts for each aggregation level at the base
+    time grain, partitioned by LGA and month.
+
+    The counts are kept before the status columns are combined, so partial sums
+    over CPOs reproduce the pivot of the raw rows exactly.
+
+    Args:
+        df (pd.DataFrame): Long-format status observations after timezone conversion.
+        levels (dict, optional): Aggregation levels by name. Defaults to config.agg_levels.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+    Returns:
+        dict: {lga_name: {month: {level_name: wide counts}}}
+    """
+    df = df.assign(month=partition_month(df, time_col))
+    cube = {}
+    for (lga_name, month), partition in df.groupby(['lga_name', 'month'], observed=True, sort=True):
+        # intervals in the LGA's timezone, so queries resample by local time
+        partition = local_partition(partition, time_col)
+        cube.setdefault(lga_name, {})[month] = {
+            name: pivot_status_data(partition, cube_level_cols(agg_cols), time_col)
+            for name, agg_cols in levels.items()
+        }
+    return cube
+
+
+def rebuild_rollup_partitions(cube: dict, partition_index, affected: list, levels: dict = agg_levels, time_col='interval'):
+    """
+    Recomputes the cube partitions for the given LGA and month pairs from the
+    partition index, leaving every other partition untouched.
+
+    Args:
+        cube (dict): Cube from build_rollup_cube or load_rollup_cube, updated in place.
+        partition_index (PartitionIndex): Index holding the current observations.
+        affected (list): (lga_name, month) pairs to recompute.
+        levels (dict, optional): Aggregation levels by name. Defaults to config.agg_levels.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+    """
+    for lga_name, month in affected:
+        partition = partition_index.partition(lga_name, month)
+        parts = {name: pivot_status_data(partition, cube_level_cols(agg_cols), time_col)
+                 for name, agg_cols in levels.items()}
+        # replace the LGA's month dictionary in one assignment so readers never see a partial update
+        cube[lga_name] = dict(sorted((cube.get(lga_name, {}) | {month: parts}).items()))
+
+
+def query_rollup_cube(cube: dict,
+                      lga_name: str,
+                      cpo_selected: list,
+                      start_date: pd.Timestamp,
+                      end_date: pd.Timestamp,
+                      agg_cols: list,
+                      interval_option: str,
+                      time_col='interval') -> pd.DataFrame:
+    """
+    Answers a dashboard query from the cube. Returns the same table as
+    process_data(filtered rows, agg_cols, interval_option, combine_cols=True).
+
+    Args:
+        cube (dict): Cube from build_rollup_cube or load_rollup_cube.
+        lga_name (str): Selected local government area.
+        cpo_selected (list): Selected charge point operators.
+        start_date (pd.Timestamp): Inclusive start of the period.
+        end_date (pd.Timestamp): Exclusive end of the period.
+        agg_cols (list): Aggregation columns, must match one of the cube levels.
+        interval_option (str): pandas resample rule, e.g. '60min' or 'ME'.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+    Returns:
+        pd.DataFrame | None: Status percentages, or None when no rows match.
+    """
+    level = next((name for name, cols in agg_levels.items() if cols == list(agg_cols)), None)
+    if level is None:
+        raise KeyError(f"No cube level for aggregation columns {agg_cols}")
+    # partitions overlapping the period, widened by a day either side for the local/UTC offset
+    first_month = (start_date - pd.Timedelta(days=1)).tz_localize(None).to_period('M')
+    last_month = (end_date + pd.Timedelta(days=1)).tz_localize(None).to_period('M')
+    partitions = [parts[level] for month, parts in cube.get(lga_name, {}).items()
+                  if first_month <= month <= last_month]
+    if not partitions:
+        return None
+    df_edit = pd.concat(partitions, ignore_index=True)
+    mask = ((df_edit[time_col] >= start_date) &
+            (df_edit[time_col] < end_date) &
+            (df_edit['cpo_name'].isin(cpo_selected)))
+    df_edit = df_edit.loc[mask]
+    if df_edit.empty:
+        return None
+    # roll the CPO dimension up when the level does not report it
+    if 'cpo_name' not in agg_cols:
+        df_edit = (df_edit
+                   .drop(columns=['cpo_name'])
+                   .groupby(agg_cols+[time_col], observed=True)
+                   .sum(min_count=1)
+                   .reset_index())
+    df_edit = combine_status_columns(df_edit)
+    return resample_status_data(df_edit, agg_cols, combined_status_cols, interval_option, time_col)
+
+
+def save_rollup_cube(cube: dict, directory=rollup_dir, time_col='interval'):
+    """
+    Writes the cube to one Parquet file per aggregation level. A column holds
+    one timezone, so the intervals are stored in UTC with each LGA's timezone.
+
+    Args:
+        cube (dict): Cube from build_rollup_cube.
+        directory (str | Path, optional): Output directory. Defaults to 'rollup_cube' next to the app.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for level in agg_levels:
+        frames = [parts[level].assign(lga_name=lga_name, month=str(month), timezone=str(parts[level][time_col].dt.tz),
+                                      **{time_col: parts[level][time_col].dt.tz_convert('UTC')})
+                  for lga_name, months in cube.items()
+                  for month, parts in months.items()]
+        if frames:
+            pd.concat(frames, ignore_index=True).to_parquet(directory / f"{level}.parquet", index=False)
+
+
+def load_rollup_cube(directory=rollup_dir, sources=data_files, time_col='interval') -> dict:
+    """
+    Loads a cube written by save_rollup_cube.
+
+    Args:
+        directory (str | Path, optional): Cube directory. Defaults to 'rollup_cube' next to the app.
+        sources (list, optional): Data files the cube must be newer than. Defaults to final_processed_data.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+    Returns:
+        dict | None: {lga_name: {month: {level_name: wide counts}}}, or None when no cube has been built
+            or the data has changed since.
+    """
+    directory = Path(directory)
+    level_paths = [directory / f"{level}.parquet" for level in agg_levels]
+    if not all(path.exists() for path in level_paths):
+        return None
+    if is_stale(level_paths, sources):
+        print(f"Ignoring stale rollup cube {directory}, rebuild it with rollup.py")
+        return None
+    cube = {}
+    for level in agg_levels:
+        level_df = pd.read_parquet(directory / f"{level}.parquet")
+        if 'timezone' not in level_df.columns:
+            # written before the timezones were stored
+            level_df['timezone'] = 'UTC'
+        for (lga_name, month, timezone), partition in level_df.groupby(['lga_name', 'month', 'timezone'], observed=True):
+            parts = cube.setdefault(lga_name, {}).setdefault(pd.Period(month, 'M'), {})
+            parts[level] = (partition
+                            .drop(columns=['lga_name', 'month', 'timezone'])
+                            .assign(**{time_col: partition[time_col].dt.tz_convert(timezone)})
+                            .reset_index(drop=True))
+    return cube
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the pre-aggregated rollup cube for the dashboard.")
+    parser.add_argument("data_path", nargs="?", default=Path(__file__).parent / "final_processed_data.parquet")
+    parser.add_argument("output_dir", nargs="?", default=rollup_dir)
+    args = parser.parse_args()
+    data_path = Path(args.data_path)
+    months_data = read_status_parquet(data_path) if data_path.suffix == '.parquet' else read_status_csv(data_path)
+    months_data = convert_dataframe_timezone(months_data, 'interval', 'state')
+    save_rollup_cube(build_rollup_cube(months_data), args.output_dir)
+    print(f"Written rollup cube to {args.output_dir}")
@@ -0,0 +1,176 @@
+#site_regions.py
+#import module
+import argparse
+import hashlib
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+#import functions
+from pathlib import Path
+from config import *
+from status_events import read_table
+
+app_dir = Path(__file__).parent
+# Cached coordinate to region lookup
+site_regions_path = app_dir / "site_regions.parquet"
+
+
+class RegionLocator:
+    """
+    Assigns LGA and postcode to site coordinates with one STRtree query per
+    boundary set. Points that fall just outside every polygon (coastal sites,
+    rounding) are given the nearest polygon within region_max_distance.
+    """
+
+    def __init__(self, geodf_lga: gpd.GeoDataFrame, geodf_poa: gpd.GeoDataFrame, lga_codes: pd.DataFrame = None):
+        lga_names = geodf_lga.index.astype(str).to_numpy()
+        if lga_codes is not None:
+            # boundary names differ from the data, e.g. 'Bathurst' is 'Bathurst Regional'
+            code_names = lga_codes.set_index(lga_codes['lga_code'].astype(str))['lga_name']
+            code_names = code_names.reindex(geodf_lga['LGA_code'].astype(str)).to_numpy()
+            lga_names = np.where(pd.isna(code_names), lga_names, code_names)
+        self.regions = {'lga_name': (shapely.STRtree(geodf_lga.geometry.to_numpy()), lga_names),
+                        'postcode': (shapely.STRtree(geodf_poa.geometry.to_numpy()), geodf_poa.index.astype(str).to_numpy())}
+        # identifies the boundary revision the assignments were made with
+        wkb = shapely.to_wkb(np.concatenate([geodf_lga.geometry.to_numpy(), geodf_poa.geometry.to_numpy()]))
+        self.version = hashlib.md5(b''.join(wkb) + ''.join(lga_names).encode()).hexdigest()
+
+    def locate(self, latitude, longitude) -> pd.DataFrame:
+        """
+        LGA and postcode of each coordinate.
+
+        Args:
+            latitude (array-like): Site latitudes.
+            longitude (array-like): Site longitudes.
+
+        Returns:
+            pd.DataFrame: 'lga_name' and 'postcode', missing where no polygon is near.
+        """
+        points = shapely.points(np.asarray(longitude, float), np.asarray(latitude, float))
+        located = {}
+        for region, (tree, names) in self.regions.items():
+            match = np.full(len(points), -1)
+            point_idx, poly_idx = tree.query(points, predicate='within')
+            # first polygon wins where boundaries overlap
+            first = np.unique(point_idx, return_index=True)[1]
+            match[point_idx[first]] = poly_idx[first]
+            outside = np.flatnonzero(match < 0)
+            if len(outside):
+                near_idx, near_poly = tree.query_nearest(points[outside], max_distance=region_max_distance, all_matches=False)
+                match[outside[near_idx]] = near_poly
+            located[region] = pd.Series(names[match], dtype='string').where(match >= 0)
+        return pd.DataFrame(located)
+
+
+def load_site_regions(path=site_regions_path, version=None) -> pd.DataFrame:
+    """
+    Reads the cached coordinate to region lookup.
+
+    Args:
+        path (str | Path, optional): Lookup file. Defaults to site_regions.parquet.
+        version (str, optional): Boundary revision to keep, other rows are dropped.
+
+    Returns:
+        pd.DataFrame: 'latitude', 'longitude', 'lga_name', 'postcode' and 'version'.
+    """
+    if path is None or not Path(path).exists():
+        return pd.DataFrame({'latitude': pd.Series(dtype=float), 'longitude': pd.Series(dtype=float),
+                             'lga_name': pd.Series(dtype='string'), 'postcode': pd.Series(dtype='string'),
+                             'version': pd.Series(dtype='string')})
+    lookup = pd.read_parquet(path)
+    return lookup if version is None else lookup.loc[lookup['version'] == version]
+
+
+def assign_site_regions(sites: pd.DataFrame, locator: RegionLocator, lookup_path=site_regions_path) -> pd.DataFrame:
+    """
+    Tags sites with 'lga_name' and 'postcode' from their coordinates. Only coordinates
+    missing from the cached lookup are located, and the lookup is updated with them.
+
+    Args:
+        sites (pd.DataFrame): Sites with 'latitude' and 'longitude'.
+        locator (RegionLocator): Boundary index.
+        lookup_path (str | Path, optional): Lookup file, None to skip caching. Defaults to site_regions.parquet.
+
+    Returns:
+        pd.DataFrame: The sites with 'lga_name' and 'postcode' replaced.
+    """
+    lookup = load_site_regions(lookup_path, locator.version)
+    coords = sites[['latitude', 'longitude']].astype(float).drop_duplicates()
+    new_coords = coords.merge(lookup[['latitude', 'longitude']], how='left', indicator=True)
+    new_coords = new_coords.loc[new_coords['_merge'] == 'left_only', ['latitude', 'longitude']].reset_index(drop=True)
+    if len(new_coords):
+        located = pd.concat([new_coords, locator.locate(new_coords['latitude'], new_coords['longitude'])], axis=1)
+        lookup = pd.concat([lookup, located.assign(version=locator.version)], ignore_index=True)
+        if lookup_path is not None:
+            lookup.to_parquet(lookup_path, index=False)
+    regions = sites[['latitude', 'longitude']].astype(float).merge(lookup, how='left', on=['latitude', 'longitude'])
+    return sites.assign(lga_name=regions['lga_name'].to_numpy(), postcode=regions['postcode'].to_numpy())
+
+
+def default_locator(data_dir=app_dir) -> RegionLocator:
+    """
+    Args:
+        data_dir (str | Path, optional): Directory of the boundary files. Defaults to the app directory.
+
+    Returns:
+        RegionLocator: Locator over the dashboard's LGA and postcode boundaries.
+    """
+    data_dir = Path(data_dir)
+    return RegionLocator(gpd.read_file(data_dir / 'geodf_lga_filter.json').set_index('LGA_name'),
+                         gpd.read_file(data_dir / 'geodf_poa_filter.json').set_index('postcode'),
+                         pd.read_csv(data_dir / "lga_geogcoord_df.csv"))
+
+
+def normalise_postcodes(postcodes: pd.Series) -> pd.Series:
+    """
+    Writes postcodes the way the boundaries name them, e.g. 2640.0 as '2640' and 800 as '0800'.
+
+    Args:
+        postcodes (pd.Series): Postcodes as numbers or strings, missing where blank.
+
+    Returns:
+        pd.Series: Postcodes as strings.
+    """
+    postcodes = postcodes.astype('string').str.strip().str.replace(r'\.0+$', '', regex=True)
+    digits = postcodes.str.fullmatch(r'\d{1,4}').fillna(False)
+    return postcodes.where(~digits, postcodes.str.zfill(4)).replace('', pd.NA)
+
+
+def fill_site_regions(sites: pd.DataFrame, locator: RegionLocator = None, lookup_path=site_regions_path) -> pd.DataFrame:
+    """
+    Tags the sites that have no LGA or postcode from their coordinates, keeping
+    the regions already given. The boundaries are only loaded when a site needs them.
+
+    Args:
+        sites (pd.DataFrame): Sites with 'latitude' and 'longitude', and optionally 'lga_name' and 'postcode'.
+        locator (RegionLocator, optional): Boundary index. Defaults to default_locator().
+        lookup_path (str | Path, optional): Lookup file, None to skip caching. Defaults to site_regions.parquet.
+
+    Returns:
+        pd.DataFrame: The sites with every 'lga_name' and 'postcode' the boundaries can give.
+    """
+    sites = sites.reindex(columns=sites.columns.union(['lga_name', 'postcode'], sort=False))
+    # given postcodes read from a partly blank numeric column look like 2640.0
+    sites = sites.assign(postcode=normalise_postcodes(sites['postcode']))
+    missing = sites['lga_name'].isna() | sites['postcode'].isna()
+    if not missing.any():
+        return sites
+    tagged = assign_site_regions(sites.loc[missing], locator or default_locator(), lookup_path)
+    # columns left empty are read as floats, the regions are strings
+    sites = sites.astype({'lga_name': object, 'postcode': object})
+    for col in ['lga_name', 'postcode']:
+        sites.loc[missing, col] = sites.loc[missing, col].fillna(tagged[col].astype(object))
+    print(f"Tagged {missing.sum()} sites with their region, {sites['lga_name'].isna().sum()} outside every LGA")
+    return sites
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag sites with their LGA and postcode from latitude/longitude.")
+    parser.add_argument("sites_path", help="CSV/Parquet with latitude and longitude columns")
+    parser.add_argument("output_path", help="CSV/Parquet to write the tagged sites to")
+    args = parser.parse_args()
+    sites = assign_site_regions(read_table(args.sites_path), default_locator())
+    output_path = Path(args.output_path)
+    sites.to_parquet(output_path, index=False) if output_path.suffix == '.parquet' else sites.to_csv(output_path, index=False)
+    print(f"Tagged {len(sites)} sites, {sites['lga_name'].isna().sum()} outside every LGA")
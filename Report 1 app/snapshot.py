@@ -0,0 +1,157 @@
+#snapshot.py
+#import module
+import argparse
+import pickle
+import threading
+import time
+import warnings
+#import functions
+from pathlib import Path
+from config import *
+from utilities import load_and_prepare_data, generate_month_dates
+from geometry import GeometryService
+from warehouse import open_warehouse
+
+app_dir = Path(__file__).parent
+# Files the start-up state is derived from, a snapshot of other versions is stale
+source_files = ["final_processed_data.parquet", "final_processed_data.csv",
+                "geodf_lga_filter.json", "geodf_poa_filter.json", "lga_geogcoord_df.csv"]
+
+
+def source_fingerprint(data_dir=app_dir, warehouse=None) -> list:
+    """
+    Args:
+        data_dir (str | Path, optional): Directory of the data files. Defaults to the app directory.
+        warehouse (StatusWarehouse, optional): Warehouse the site list is read from.
+
+    Returns:
+        list: (file, size, modification time) of every source file present.
+    """
+    paths = [Path(data_dir) / name for name in source_files]
+    if warehouse is not None:
+        paths += warehouse.files()
+    return [(str(path), path.stat().st_size, path.stat().st_mtime_ns) for path in paths if path.exists()]
+
+
+def derive_startup_state(months_data, lga_geogcoord_dict: dict, poa_suburb: dict, geodf_filter_lga, geodf_filter_poa) -> dict:
+    """
+    Everything the app needs before it can serve the UI, derived from the
+    outputs of load_and_prepare_data.
+
+    Args:
+        months_data (pd.DataFrame): Observations, or the warehouse's site list.
+        lga_geogcoord_dict (dict): LGA centre coordinates.
+        poa_suburb (dict): Postcode to suburb.
+        geodf_filter_lga (gpd.GeoDataFrame): LGA boundaries.
+        geodf_filter_poa (gpd.GeoDataFrame): Postcode boundaries.
+
+    Returns:
+        dict: Month slider range and dates, state and LGA choices, CPO names, map
+            lookups and the GeometryService.
+    """
+    # postcode polygons pre-sliced and simplified per LGA for the map
+    lga_postcodes = months_data[['lga_name','postcode']].drop_duplicates().groupby('lga_name', observed=True)['postcode'].agg(list).to_dict()
+    geometry_service = GeometryService(geodf_filter_poa, geodf_filter_lga, lga_geogcoord_dict, lga_postcodes)
+    return {'start_month': months_data['interval'].dt.month.min(),
+            'end_month': months_data['interval'].dt.month.max() + 1,
+            'month_dates': generate_month_dates(months_data, 'interval'),
+            'state_lga_dict': {state: {lga: lga for lga in sorted(months_data.loc[months_data.state == state,'lga_name'].unique())}
+                               for state in sorted(months_data['state'].unique())},
+            'cpo_names': list(months_data['cpo_name'].unique()),
+            'lga_geogcoord_dict': lga_geogcoord_dict,
+            'poa_suburb': poa_suburb,
+            'geometry_service': geometry_service}
+
+
+def build_snapshot(data_dir=app_dir, path=snapshot_path) -> Path:
+    """
+    Derives the app's start-up state once and writes it to a single pickle, with
+    every LGA's map GeoJSON already built. The app then starts without reading
+    the observations, which are loaded on the first query.
+
+    Args:
+        data_dir (str | Path, optional): Directory of the data files. Defaults to the app directory.
+        path (str | Path, optional): Snapshot file. Defaults to config.snapshot_path.
+
+    Returns:
+        Path: The snapshot file.
+    """
+    warehouse = open_warehouse()
+    state = derive_startup_state(*load_and_prepare_data(local_env=True, data_dir=data_dir, warehouse=warehouse))
+    for lga_name in state['geometry_service'].lga_postcodes:
+        state['geometry_service'].geojson(lga_name)
+    path = Path(path)
+    # write then rename so a starting app never reads a half written file
+    with open(path.with_suffix('.tmp'), 'wb') as file:
+        pickle.dump({'fingerprint': source_fingerprint(data_dir, warehouse), 'state': state}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    path.with_suffix('.tmp').replace(path)
+    return path
+
+
+def load_snapshot(data_dir=app_dir, path=snapshot_path, warehouse=None) -> dict:
+    """
+    Args:
+        data_dir (str | Path, optional): Directory of the data files. Defaults to the app directory.
+        path (str | Path, optional): Snapshot file. Defaults to config.snapshot_path.
+        warehouse (StatusWarehouse, optional): Warehouse the app queries.
+
+    Returns:
+        dict | None: State of derive_startup_state, or None when no snapshot has been
+            built or the data has changed since.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, 'rb') as file:
+        snapshot = pickle.load(file)
+    if snapshot['fingerprint'] != source_fingerprint(data_dir, warehouse):
+        print(f"Ignoring stale start-up snapshot {path}, rebuild it with snapshot.py")
+        return None
+    return snapshot['state']
+
+
+class LazyLoad:
+    """
+    Value computed by a loader on first use, once, however many threads ask for it.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self):
+        """
+        Returns:
+            object: The loader's return value, loading it if this is the first call.
+        """
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._loader()
+                    self._loaded = True
+        return self._value
+
+    def set(self, value):
+        """
+        Args:
+            value (object): Value already at hand, used in place of calling the loader.
+        """
+        with self._lock:
+            self._value = value
+            self._loaded = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prebuild the dashboard's start-up state so the app starts without loading the data.")
+    parser.add_argument("data_dir", nargs="?", default=app_dir)
+    parser.add_argument("output_path", nargs="?", default=snapshot_path)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    start = time.perf_counter()
+    print(f"Written start-up snapshot to {build_snapshot(args.data_dir, args.output_path)} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,216 @@
+#status_events.py
+#import module
+import argparse
+import numpy as np
+import pandas as pd
+#import functions
+from pathlib import Path
+from config import *
+from data_store import apply_status_schema, write_status_parquet
+
+# Site columns carried through to final_processed_data.csv
+site_cols = ['cpo_name', 'lga_name', 'state', 'address1', 'address2', 'postcode', 'latitude', 'longitude']
+# Site columns that are labels, read as strings so partly empty columns are not read as floats
+site_label_cols = ['cpo_name', 'lga_name', 'state', 'address1', 'address2', 'postcode']
+
+
+def normalise_status(status: pd.Series) -> pd.Series:
+    """
+    Maps raw OCPP/OCPI connector statuses onto the dashboard's status types.
+    Anything unrecognised is treated as 'Unknown'.
+
+    Args:
+        status (pd.Series): Raw status strings.
+
+    Returns:
+        pd.Series: Categorical series with categories config.event_status_types.
+    """
+    status = status.astype('string').str.strip()
+    # resolve each distinct raw status once, then map the whole column
+    aliases = {value: status_aliases.get(value, status_aliases.get(value.upper(), value))
+               for value in status.dropna().unique()}
+    return pd.Categorical(status.map(aliases), categories=event_status_types).fillna('Unknown')
+
+
+def status_segments(events: pd.DataFrame,
+                    connector_ids: np.ndarray,
+                    window_start: pd.Timestamp,
+                    window_end: pd.Timestamp,
+                    max_gap: pd.Timedelta) -> pd.DataFrame:
+    """
+    Turns status-change events into [start, end) segments per connector with a
+    sort-and-diff sweep. A status is trusted for at most max_gap after it was
+    observed, the rest of a longer gap is 'Unknown'. Time before a connector's
+    first event, and connectors without any event, are 'Unknown'.
+
+    Args:
+        events (pd.DataFrame): 'connector_id', 'timestamp' (UTC) and normalised 'status'.
+        connector_ids (np.ndarray): Every connector to account for.
+        window_start (pd.Timestamp): Inclusive start of the window.
+        window_end (pd.Timestamp): Exclusive end of the window.
+        max_gap (pd.Timedelta): Longest time a status holds without a new observation.
+
+    Returns:
+        pd.DataFrame: 'connector_id', 'start', 'end' (int64 ns) and 'status' segments.
+    """
+    events = events.sort_values(['connector_id', 'timestamp'], kind='stable')
+    connector = events['connector_id'].to_numpy()
+    start = events['timestamp'].array.as_unit('ns').asi8
+    status = events['status'].to_numpy()
+    window = (window_start.as_unit('ns').value, window_end.as_unit('ns').value)
+    gap = max_gap.value
+
+    # the next event of the same connector ends a status, the window end closes the last one
+    last_of_connector = np.append(connector[1:] != connector[:-1], True)
+    end = np.where(last_of_connector, window[1], np.append(start[1:], window[1]))
+    trusted_end = np.minimum(end, start + gap)
+
+    observed = pd.DataFrame({'connector_id': connector, 'start': start, 'end': trusted_end, 'status': status})
+    # unobserved remainder of long gaps
+    stale = trusted_end < end
+    gaps = pd.DataFrame({'connector_id': connector[stale], 'start': trusted_end[stale], 'end': end[stale], 'status': 'Unknown'})
+    # before the first event of each connector, or the whole window without events
+    first_of_connector = np.insert(connector[1:] != connector[:-1], 0, True) if len(connector) else np.array([], bool)
+    first_seen = pd.Series(start[first_of_connector], index=connector[first_of_connector])
+    first_seen = first_seen.reindex(connector_ids, fill_value=window[1])
+    leading = pd.DataFrame({'connector_id': first_seen.index, 'start': window[0], 'end': first_seen.to_numpy(), 'status': 'Unknown'})
+
+    segments = pd.concat([observed, gaps, leading], ignore_index=True)
+    segments['start'] = segments['start'].clip(lower=window[0])
+    segments['end'] = segments['end'].clip(upper=window[1])
+    segments = segments.loc[segments['end'] > segments['start']]
+    segments['status'] = pd.Categorical(segments['status'], categories=event_status_types)
+    return segments.reset_index(drop=True)
+
+
+def split_segments(segments: pd.DataFrame, origin: int, freq: int) -> pd.DataFrame:
+    """
+    Splits segments at interval boundaries so each piece falls in a single interval.
+
+    Args:
+        segments (pd.DataFrame): Output of status_segments.
+        origin (int): Start of the first interval (ns since epoch).
+        freq (int): Interval length (ns).
+
+    Returns:
+        pd.DataFrame: 'connector_id', 'status', 'bin' (interval number) and 'duration' (ns).
+    """
+    start = segments['start'].to_numpy()
+    end = segments['end'].to_numpy()
+    first_bin = (start - origin) // freq
+    last_bin = (end - 1 - origin) // freq
+    pieces = (last_bin - first_bin + 1).astype('int64')
+    # one row per (segment, interval it overlaps)
+    segment = np.repeat(np.arange(len(segments)), pieces)
+    bin_number = first_bin[segment] + (np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces))
+    bin_start = origin + bin_number * freq
+    duration = np.minimum(end[segment], bin_start + freq) - np.maximum(start[segment], bin_start)
+    return pd.DataFrame({'connector_id': segments['connector_id'].to_numpy()[segment],
+                         'status': segments['status'].to_numpy()[segment],
+                         'bin': bin_number,
+                         'duration': duration})
+
+
+def events_to_status_counts(events: pd.DataFrame,
+                            connectors: pd.DataFrame,
+                            freq='1min',
+                            window_start=None,
+                            window_end=None,
+                            max_gap=event_max_gap,
+                            unit=pd.Timedelta(seconds=1)) -> pd.DataFrame:
+    """
+    Converts raw connector status-change events into the long-format per-interval
+    status durations that process_data expects (the final_processed_data.csv layout).
+
+    Each status 'value' is the time connectors at a site spent in that status during
+    the interval, in multiples of `unit`. 'Total' is the sum over statuses and
+    'evse_port_site_count' the number of connectors at the site.
+
+    Args:
+        events (pd.DataFrame): 'connector_id', 'timestamp' and raw 'status' columns.
+        connectors (pd.DataFrame): 'connector_id' plus the site columns
+            (cpo_name, lga_name, state, address1, address2, postcode, latitude, longitude),
+            one row per connector. A ValueError names any connector_id listed twice.
+        freq (str, optional): Interval length. Defaults to '1min'.
+        window_start (pd.Timestamp, optional): Start of the window. Defaults to the first event, floored to freq.
+        window_end (pd.Timestamp, optional): End of the window. Defaults to the interval after the last event.
+        max_gap (pd.Timedelta, optional): Longest time a status holds without a new observation.
+            Defaults to config.event_max_gap.
+        unit (pd.Timedelta, optional): Unit of the output durations. Defaults to one second.
+
+    Returns:
+        pd.DataFrame: Typed long-format status observations with a UTC 'interval'.
+    """
+    freq = pd.Timedelta(freq)
+    duplicated = connectors.loc[connectors['connector_id'].duplicated(), 'connector_id'].unique()
+    if len(duplicated):
+        raise ValueError(f"Connectors listed more than once: {', '.join(map(str, duplicated[:10]))}"
+                         + (f" and {len(duplicated) - 10} more" if len(duplicated) > 10 else ""))
+    events = events.loc[events['connector_id'].isin(connectors['connector_id']),
+                        ['connector_id', 'timestamp', 'status']]
+    events = events.assign(timestamp=pd.to_datetime(events['timestamp'], utc=True),
+                           status=normalise_status(events['status']))
+    if events.empty and (window_start is None or window_end is None):
+        # no events to take the window from
+        return apply_status_schema(pd.DataFrame(columns=site_cols + ['interval', 'variable', 'value']))
+    window_start = pd.to_datetime(window_start, utc=True) if window_start is not None else events['timestamp'].min().floor(freq)
+    window_end = pd.to_datetime(window_end, utc=True) if window_end is not None else events['timestamp'].max().floor(freq) + freq
+    events = events.loc[events['timestamp'] < window_end]
+
+    segments = status_segments(events, connectors['connector_id'].to_numpy(), window_start, window_end, max_gap)
+    pieces = split_segments(segments, window_start.as_unit('ns').value, freq.value)
+
+    # sum the durations per site, interval and status
+    connector_site = connectors.set_index('connector_id')[site_cols]
+    site_codes = connector_site.groupby(site_cols, sort=False, dropna=False, observed=True).ngroup()
+    sites = connector_site.assign(site=site_codes).drop_duplicates('site').set_index('site').sort_index()
+    pieces['site'] = site_codes.reindex(pieces['connector_id']).to_numpy()
+    durations = (pieces
+                 .groupby(['site', 'bin', 'status'], observed=True)['duration']
+                 .sum()
+                 .unstack('status', fill_value=0))
+    durations.columns = durations.columns.astype(str)
+    durations = durations.reindex(columns=event_status_types, fill_value=0)
+    durations['Total'] = durations.sum(axis=1)
+    durations = np.rint(durations / unit.value).astype('int64')
+    port_counts = site_codes.value_counts()
+    durations['evse_port_site_count'] = port_counts.reindex(durations.index.get_level_values('site')).to_numpy()
+
+    # back to the long layout with the site columns attached
+    long_data = durations.reset_index().melt(id_vars=['site', 'bin'], var_name='variable', value_name='value')
+    long_data['interval'] = window_start + long_data['bin'] * freq
+    long_data = pd.concat([sites.iloc[long_data['site']].reset_index(drop=True),
+                           long_data[['interval', 'variable', 'value']]], axis=1)
+    return apply_status_schema(long_data)
+
+
+def read_table(path) -> pd.DataFrame:
+    """
+    Reads a CSV or Parquet file based on its suffix. The site label columns are read
+    as strings, so a postcode column with blanks keeps '2640' rather than 2640.0.
+
+    Args:
+        path (str | Path): File to read.
+
+    Returns:
+        pd.DataFrame: File contents.
+    """
+    path = Path(path)
+    if path.suffix != '.parquet':
+        return pd.read_csv(path, dtype={col: 'string' for col in site_label_cols})
+    table = pd.read_parquet(path)
+    return table.astype({col: 'string' for col in site_label_cols if col in table.columns})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build final_processed_data.parquet from raw connector status events.")
+    parser.add_argument("events_path", help="CSV/Parquet with connector_id, timestamp and status columns")
+    parser.add_argument("connectors_path", help="CSV/Parquet with connector_id and the site columns")
+    parser.add_argument("output_path", nargs="?", default=Path(__file__).parent / "final_processed_data.parquet")
+    parser.add_argument("--freq", default="1min", help="Interval length, e.g. 1min or 15min")
+    args = parser.parse_args()
+    status_counts = events_to_status_counts(read_table(args.events_path),
+                                            read_table(args.connectors_path),
+                                            freq=args.freq)
+    write_status_parquet(status_counts, args.output_path)
+    print(f"Written {len(status_counts)} rows to {args.output_path}")
@@ -0,0 +1,144 @@
+#synthetic_data.py
+#import module
+import argparse
+import numpy as np
+import pandas as pd
+#import functions
+from pathlib import Path
+from config import *
+from data_store import sort_categories, write_status_parquet
+from status_events import site_cols
+
+app_dir = Path(__file__).parent
+# State of an LGA from the first digit of its ABS code
+lga_code_states = {1: 'NSW', 2: 'VIC', 3: 'QLD', 4: 'SA', 5: 'WA', 6: 'TAS', 7: 'NT', 8: 'ACT'}
+# First digit of the state's postcodes
+state_postcode_prefix = {'NSW': 2, 'ACT': 2, 'VIC': 3, 'QLD': 4, 'SA': 5, 'WA': 6, 'TAS': 7, 'NT': 0}
+# Status mix of a port outside the busy hours, the charging share rises during the day
+base_status_shares = {'Charging': 0.08, 'Finishing': 0.02, 'Reserved': 0.01, 'Unavailable': 0.03,
+                      'Out of order': 0.02, 'Available': 0.80, 'Unknown': 0.04}
+
+
+def synthetic_cpo_names(n_cpos: int) -> list:
+    """
+    The dashboard's CPOs first, then numbered ones.
+
+    Args:
+        n_cpos (int): Number of CPOs.
+
+    Returns:
+        list: CPO names.
+    """
+    known = [cpo for cpo in cpo_styles if cpo != 'Overall']
+    return (known + [f"CPO {number}" for number in range(len(known) + 1, n_cpos + 1)])[:n_cpos]
+
+
+def synthetic_sites(n_cpos=4, n_sites=100, locator=None, seed=0) -> pd.DataFrame:
+    """
+    Charging sites spread over LGAs in every state, placed around each LGA's centre.
+    Site counts per LGA follow a Zipf distribution, so a few LGAs hold many sites.
+
+    Args:
+        n_cpos (int, optional): Number of CPOs. Defaults to 4.
+        n_sites (int, optional): Number of sites. Defaults to 100.
+        locator (RegionLocator, optional): Assigns real postcodes where a site falls in a
+            known postcode polygon. Other sites get a made-up postcode of their state.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: Site columns plus 'ports', one row per site.
+    """
+    rng = np.random.default_rng(seed)
+    lgas = pd.read_csv(app_dir / "lga_geogcoord_df.csv")
+    lgas['state'] = (lgas['lga_code'] // 10000).map(lga_code_states)
+    lgas = lgas.dropna(subset=['state']).reset_index(drop=True)
+    # rank LGAs taking each state in turn, so the most popular LGAs cover every state
+    lgas = lgas.sample(frac=1, random_state=seed)
+    lgas = lgas.iloc[np.argsort(lgas.groupby('state').cumcount().to_numpy(), kind='stable')]
+    rank = np.minimum(rng.zipf(synthetic_lga_zipf, n_sites), len(lgas)) - 1
+    lga = lgas.iloc[rank].reset_index(drop=True)
+    sites = pd.DataFrame({'cpo_name': np.array(synthetic_cpo_names(n_cpos))[rng.integers(0, n_cpos, n_sites)],
+                          'lga_name': lga['lga_name'],
+                          'state': lga['state'],
+                          'address1': [f"{number} Synthetic Road" for number in range(n_sites)],
+                          'address2': lga['lga_name'] + " " + (np.arange(n_sites) % 3).astype(str),
+                          'postcode': [f"{state_postcode_prefix[state]}{code % 1000:03d}" for state, code in zip(lga['state'], lga['lga_code'])],
+                          'latitude': lga['lat'] + rng.normal(0, 0.02, n_sites),
+                          'longitude': lga['lon'] + rng.normal(0, 0.02, n_sites),
+                          'ports': rng.integers(1, 9, n_sites)})
+    if locator is not None:
+        postcodes = locator.locate(sites['latitude'], sites['longitude'])['postcode']
+        sites['postcode'] = postcodes.fillna(sites['postcode']).to_numpy()
+    return sites
+
+
+def synthetic_status_data(n_cpos=4, n_sites=100, minutes=7*24*60, freq='15min', start='2024-03-01', locator=None, seed=0) -> pd.DataFrame:
+    """
+    Long-format status data in the final_processed_data layout.
+
+    Each interval splits a site's ports over the statuses with a multinomial draw.
+    The charging share follows the local time of day. 'Total' and
+    'evse_port_site_count' are the site's port count.
+
+    Args:
+        n_cpos (int, optional): Number of CPOs. Defaults to 4.
+        n_sites (int, optional): Number of sites. Defaults to 100.
+        minutes (int, optional): Length of the period in minutes. Defaults to one week.
+        freq (str, optional): Interval length. Defaults to '15min'.
+        start (str, optional): First interval (UTC). Defaults to '2024-03-01'.
+        locator (RegionLocator, optional): See synthetic_sites.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: Typed long-format status observations.
+    """
+    rng = np.random.default_rng(seed)
+    sites = synthetic_sites(n_cpos, n_sites, locator, seed)
+    intervals = pd.date_range(start, periods=int(pd.Timedelta(minutes=minutes) / pd.Timedelta(freq)), freq=freq, tz='UTC')
+    # local hour of every site and interval, one conversion per state
+    local_hour = np.empty((n_sites, len(intervals)))
+    for state, rows in sites.groupby('state').indices.items():
+        local_hour[rows] = intervals.tz_convert(timezone_mappings[state]).hour.to_numpy()
+    busy = np.clip(np.sin((local_hour - 6) / 16 * np.pi), 0, None)
+    shares = np.broadcast_to(np.array(list(base_status_shares.values())), busy.shape + (len(base_status_shares),)).copy()
+    shares[..., 0] += 0.3 * busy
+    shares[..., 5] -= 0.3 * busy
+    ports = sites['ports'].to_numpy()
+    counts = rng.multinomial(np.broadcast_to(ports[:, None], busy.shape), shares)
+    # statuses, Total and port count as the last axis
+    values = np.concatenate([counts, np.broadcast_to(ports[:, None, None], busy.shape + (2,))], axis=-1).astype('int32')
+    variables = list(base_status_shares) + ['Total', 'evse_port_site_count']
+
+    # long layout: site, then interval, then variable
+    n_rows = values.size
+    site = np.repeat(np.arange(n_sites), len(intervals) * len(variables))
+    long_data = {}
+    for col in site_cols:
+        if col in ('latitude', 'longitude'):
+            long_data[col] = sites[col].to_numpy()[site]
+        else:
+            codes, categories = pd.factorize(sites[col])
+            long_data[col] = pd.Categorical.from_codes(codes[site], categories)
+    long_data['interval'] = pd.to_datetime(np.tile(np.repeat(intervals.asi8, len(variables)), n_sites), utc=True)
+    long_data['variable'] = pd.Categorical.from_codes(np.tile(np.arange(len(variables)), n_rows // len(variables)), variables)
+    long_data['value'] = values.reshape(-1)
+    return sort_categories(pd.DataFrame(long_data))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic national status data.")
+    parser.add_argument("output_path", help="Output .parquet or .csv file")
+    parser.add_argument("--cpos", type=int, default=4)
+    parser.add_argument("--sites", type=int, default=100)
+    parser.add_argument("--minutes", type=int, default=7*24*60)
+    parser.add_argument("--freq", default="15min")
+    parser.add_argument("--start", default="2024-03-01")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    status_data = synthetic_status_data(args.cpos, args.sites, args.minutes, args.freq, args.start, seed=args.seed)
+    output_path = Path(args.output_path)
+    if output_path.suffix == '.csv':
+        status_data.to_csv(output_path, index=False)
+    else:
+        write_status_parquet(status_data, output_path)
+    print(f"Written {len(status_data):,} rows to {output_path}")
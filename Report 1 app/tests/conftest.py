@@ -0,0 +1,8 @@
+#conftest.py
+#import module
+import sys
+#import functions
+from pathlib import Path
+
+# the app's modules import each other by name from the app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
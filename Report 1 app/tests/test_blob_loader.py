@@ -0,0 +1,96 @@
+#test_blob_loader.py
+#import module
+import json
+import pytest
+#import functions
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotFoundError, ResourceNotModifiedError, ServiceRequestError
+from blob_loader import BlobLoader
+
+
+class StubBlobClient:
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+
+    def download_blob(self, max_concurrency=1, etag=None, match_condition=None):
+        container = self.container
+        container.requests.append((self.name, etag, match_condition))
+        if container.unreachable:
+            raise ServiceRequestError("connection refused")
+        if self.name not in container.blobs:
+            raise ResourceNotFoundError("blob not found")
+        data, current_etag = container.blobs[self.name]
+        if match_condition == MatchConditions.IfModified and etag == current_etag:
+            raise ResourceNotModifiedError(response=SimpleNamespace(status_code=304, reason='Not Modified',
+                                                                    headers={}, text=lambda *args, **kwargs: ''))
+        container.downloads += 1
+        properties = SimpleNamespace(etag=current_etag, last_modified=datetime(2024, 4, 1, tzinfo=timezone.utc))
+        return SimpleNamespace(readinto=lambda file: file.write(data), properties=properties)
+
+
+class StubContainerClient:
+    """
+    In-memory container answering conditional downloads like Blob Storage.
+    """
+
+    def __init__(self, blobs: dict):
+        self.blobs = blobs
+        self.requests = []
+        self.downloads = 0
+        self.unreachable = False
+
+    def get_blob_client(self, name):
+        return StubBlobClient(self, name)
+
+
+@pytest.fixture
+def loader(tmp_path):
+    # the Azurite connection string is parsed without connecting, the container is then stubbed
+    loader = BlobLoader("UseDevelopmentStorage=true", cache_dir=tmp_path)
+    loader.container_client = StubContainerClient({'data.parquet': (b'first', '"etag-1"')})
+    return loader
+
+
+def test_miss_downloads_and_records_etag(loader, tmp_path):
+    path = loader.fetch('data.parquet')
+    assert path == tmp_path / 'data.parquet'
+    assert path.read_bytes() == b'first'
+    assert loader.container_client.requests == [('data.parquet', None, None)]
+    assert json.loads((tmp_path / 'data.parquet.etag').read_text())['etag'] == '"etag-1"'
+
+
+def test_hit_revalidates_without_downloading(loader):
+    loader.fetch('data.parquet')
+    path = loader.fetch('data.parquet')
+    assert path.read_bytes() == b'first'
+    assert loader.container_client.downloads == 1
+    assert loader.container_client.requests[-1] == ('data.parquet', '"etag-1"', MatchConditions.IfModified)
+
+
+def test_changed_blob_is_downloaded_again(loader, tmp_path):
+    loader.fetch('data.parquet')
+    loader.container_client.blobs['data.parquet'] = (b'second', '"etag-2"')
+    path = loader.fetch('data.parquet')
+    assert path.read_bytes() == b'second'
+    assert loader.container_client.downloads == 2
+    assert json.loads((tmp_path / 'data.parquet.etag').read_text())['etag'] == '"etag-2"'
+
+
+def test_missing_blob_returns_none(loader):
+    assert loader.fetch('missing.csv') is None
+    assert loader.fetch_all(['data.parquet', 'missing.csv'])['missing.csv'] is None
+
+
+def test_unreachable_storage_uses_cached_copy(loader):
+    loader.fetch('data.parquet')
+    loader.container_client.unreachable = True
+    assert loader.fetch('data.parquet').read_bytes() == b'first'
+
+
+def test_unreachable_storage_without_cache_raises(loader):
+    loader.container_client.unreachable = True
+    with pytest.raises(ServiceRequestError):
+        loader.fetch('data.parquet')
@@ -0,0 +1,43 @@
+#test_grouping_sets.py
+#import module
+import numpy as np
+import pandas as pd
+import pytest
+#import functions
+from config import *
+from utilities import convert_dataframe_timezone, process_data, process_data_grouping_sets
+from data_store import to_wide_status
+from synthetic_data import synthetic_status_data
+
+# Aggregation lists of the dashboard's three levels
+grouping_sets = [agg_levels['cpo'], agg_levels['site'], agg_levels['postcode']]
+
+
+@pytest.fixture(scope='module')
+def long_data():
+    long_data = synthetic_status_data(n_cpos=3, n_sites=30, minutes=21*24*60, start='2024-03-25')
+    # one LGA, the dashboard aggregates a single LGA's rows
+    lga_name = long_data['lga_name'].value_counts().index[0]
+    return convert_dataframe_timezone(long_data.loc[long_data['lga_name'] == lga_name].reset_index(drop=True),
+                                      'interval', 'state')
+
+
+@pytest.fixture(scope='module')
+def long_data_missing(long_data):
+    # drop a fifth of the status observations, some statuses of some intervals are never reported
+    keep = np.random.default_rng(0).random(len(long_data)) > 0.2
+    missing = long_data.loc[keep | long_data['variable'].isin(['Total', 'evse_port_site_count'])].reset_index(drop=True)
+    assert to_wide_status(missing)['Charging'].isna().any()
+    return missing
+
+
+@pytest.mark.parametrize('interval_option', ['60min', '1440min', '10080min', 'ME'])
+@pytest.mark.parametrize('combine_cols', [True, False])
+@pytest.mark.parametrize('data', ['long_data', 'long_data_missing'])
+def test_grouping_sets_match_process_data(request, data, interval_option, combine_cols):
+    df = request.getfixturevalue(data)
+    for layout in [df, to_wide_status(df)]:
+        grouped = process_data_grouping_sets(layout, grouping_sets, interval_option, combine_cols)
+        for agg_cols, result in zip(grouping_sets, grouped):
+            pd.testing.assert_frame_equal(result, process_data(layout, agg_cols, interval_option, combine_cols).reset_index(drop=True),
+                                          check_dtype=False)
@@ -0,0 +1,47 @@
+#test_site_regions.py
+#import module
+import geopandas as gpd
+import pandas as pd
+import pytest
+#import functions
+from shapely.geometry import box
+from site_regions import RegionLocator, fill_site_regions
+from status_events import read_table
+
+
+@pytest.fixture
+def locator():
+    # one LGA and one postcode covering the same square
+    geodf_lga = gpd.GeoDataFrame({'LGA_code': ['10050']}, geometry=[box(146.0, -36.2, 147.0, -35.9)],
+                                 index=pd.Index(['Albury'], name='LGA_name'))
+    geodf_poa = gpd.GeoDataFrame(geometry=[box(146.0, -36.2, 147.0, -35.9)], index=pd.Index(['2640'], name='postcode'))
+    return RegionLocator(geodf_lga, geodf_poa)
+
+
+@pytest.fixture
+def sites_path(tmp_path):
+    path = tmp_path / "sites.csv"
+    path.write_text("connector_id,lga_name,postcode,latitude,longitude\n"
+                    "c1,Albury,2640,-36.08,146.91\n"
+                    "c2,,,-36.05,146.95\n"
+                    "c3,Darwin,800,-12.46,130.84\n")
+    return path
+
+
+def test_partly_blank_postcodes_are_read_as_strings(sites_path):
+    sites = read_table(sites_path)
+    assert sites['postcode'].tolist()[0] == '2640'
+    assert sites['postcode'].isna().tolist() == [False, True, False]
+
+
+def test_given_and_tagged_postcodes_match(sites_path, locator):
+    sites = fill_site_regions(read_table(sites_path), locator, lookup_path=None)
+    assert sites['postcode'].tolist() == ['2640', '2640', '0800']
+    assert sites['lga_name'].tolist() == ['Albury', 'Albury', 'Darwin']
+
+
+def test_float_postcodes_are_normalised(locator):
+    sites = pd.DataFrame({'lga_name': ['Albury', None], 'postcode': [2640.0, None],
+                          'latitude': [-36.08, -36.05], 'longitude': [146.91, 146.95]})
+    sites = fill_site_regions(sites, locator, lookup_path=None)
+    assert sites['postcode'].tolist() == ['2640', '2640']
@@ -0,0 +1,75 @@
+#test_timezones.py
+#import module
+import pandas as pd
+import pytest
+#import functions
+from config import *
+from utilities import convert_dataframe_timezone, process_data
+from data_store import to_wide_status
+from partition_index import PartitionIndex
+from rollup import build_rollup_cube, save_rollup_cube, load_rollup_cube, query_rollup_cube
+from synthetic_data import synthetic_status_data
+
+# Daylight saving ends in the south-eastern states at 03:00 local on 7 April 2024
+dst_end = pd.Timestamp('2024-04-06 16:00', tz='UTC')
+
+
+@pytest.fixture(scope='module')
+def wide_data():
+    return to_wide_status(synthetic_status_data(n_cpos=2, n_sites=40, minutes=4*24*60, start='2024-04-05'))
+
+
+@pytest.fixture(scope='module')
+def dst_lgas(wide_data):
+    lgas = wide_data.loc[wide_data['state'].isin(['NSW', 'VIC', 'SA', 'TAS', 'ACT']), 'lga_name'].unique()
+    assert len(lgas) > 0
+    return list(lgas)
+
+
+def local_selection(wide_data, lga_name):
+    # one LGA converted on its own, a single timezone
+    return convert_dataframe_timezone(wide_data.loc[wide_data['lga_name'] == lga_name].copy(), 'interval', 'state')
+
+
+def test_mixed_states_keep_utc_and_local_time(wide_data, dst_lgas):
+    converted = convert_dataframe_timezone(wide_data.copy(), 'interval', 'state')
+    assert str(converted['interval'].dt.tz) == 'UTC'
+    row = converted.loc[converted['lga_name'] == dst_lgas[0]].iloc[0]
+    assert row['interval_local'] == row['interval'].tz_convert(timezone_mappings[row['state']]).tz_localize(None)
+
+
+def test_states_with_the_same_offsets_convert_in_place(wide_data):
+    # Sydney and Canberra share their offsets and daylight saving dates
+    nsw_act = wide_data.loc[wide_data['state'].isin(['NSW', 'ACT'])].copy()
+    nsw_act['state'] = pd.Categorical(['NSW', 'ACT'] * (len(nsw_act) // 2) + ['NSW'] * (len(nsw_act) % 2))
+    converted = convert_dataframe_timezone(nsw_act, 'interval', 'state')
+    assert 'interval_local' not in converted.columns
+    assert str(converted['interval'].dt.tz) == 'Australia/Sydney'
+
+
+@pytest.mark.parametrize('interval_option', ['60min', '1440min'])
+def test_partition_index_resamples_in_local_time_across_dst(wide_data, dst_lgas, interval_option):
+    index = PartitionIndex(convert_dataframe_timezone(wide_data.copy(), 'interval', 'state'))
+    start, end = pd.Timestamp('2024-04-05', tz='UTC'), pd.Timestamp('2024-04-10', tz='UTC')
+    for lga_name in dst_lgas:
+        expected = local_selection(wide_data, lga_name)
+        cpos = list(expected['cpo_name'].unique())
+        selected = index.select(lga_name, cpos, start, end)
+        assert selected['interval'].dt.tz == expected['interval'].dt.tz
+        assert selected['interval'].min() < dst_end <= selected['interval'].max()
+        for agg_cols in agg_levels.values():
+            pd.testing.assert_frame_equal(process_data(selected, agg_cols, interval_option, True),
+                                          process_data(expected, agg_cols, interval_option, True))
+
+
+def test_rollup_cube_resamples_in_local_time_across_dst(wide_data, dst_lgas, tmp_path):
+    save_rollup_cube(build_rollup_cube(convert_dataframe_timezone(wide_data.copy(), 'interval', 'state')), tmp_path)
+    cube = load_rollup_cube(tmp_path, sources=[])
+    start, end = pd.Timestamp('2024-04-05', tz='UTC'), pd.Timestamp('2024-04-10', tz='UTC')
+    for lga_name in dst_lgas:
+        expected = local_selection(wide_data, lga_name)
+        cpos = list(expected['cpo_name'].unique())
+        for agg_cols in agg_levels.values():
+            pd.testing.assert_frame_equal(query_rollup_cube(cube, lga_name, cpos, start, end, agg_cols, '1440min'),
+                                          process_data(expected, agg_cols, '1440min', True),
+                                          check_dtype=False, check_categorical=False)
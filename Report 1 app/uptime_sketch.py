@@ -0,0 +1,143 @@
+#uptime_sketch.py
+#import module
+import numpy as np
+import pandas as pd
+#import functions
+from config import *
+from utilities import combine_status_columns
+from data_store import status_value_cols
+
+# Bins of the uptime histograms, equal widths over 0-100%
+bin_edges = np.linspace(0, 100, uptime_sketch_bins + 1)
+bin_cols = [f"bin_{number}" for number in range(uptime_sketch_bins)]
+
+
+def uptime_histograms(partition: pd.DataFrame, time_col='interval') -> pd.DataFrame:
+    """
+    Uptime histogram of every site over the days of one partition. Each site
+    and local day is one sample, its uptime being the share of port intervals
+    in use or available, counted once per charger of the site so the histograms
+    are over charger days. The ports of a site share its uptime, the counts do
+    not say which port was down.
+
+    Args:
+        partition (pd.DataFrame): Wide status observations of one LGA and month.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+    Returns:
+        pd.DataFrame: Site columns and one charger day count column per bin, one row per site.
+    """
+    site_cols = agg_levels['site']
+    # mixed timezone data keeps UTC in time_col and the local time next to it
+    local_time = partition[f"{time_col}_local"] if f"{time_col}_local" in partition else partition[time_col].dt.tz_localize(None)
+    counts = combine_status_columns(partition[site_cols + status_value_cols].copy())
+    days = (counts.assign(day=local_time.dt.floor('D').to_numpy(), up=counts['in_use'] + counts['Available'])
+            .groupby(site_cols + ['day'], observed=True, dropna=False)
+            .agg(up=('up', 'sum'), Total=('Total', 'sum'), chargers=('evse_port_site_count', 'max')))
+    days = days.loc[days['Total'] > 0]
+    # a site without a port count is counted as one charger
+    chargers = np.maximum(days['chargers'].fillna(1).to_numpy('int64'), 1)
+    # the counts are small integers, scale them as floats so they cannot overflow
+    uptime = days['up'].to_numpy('float64') * 100 / days['Total'].to_numpy('float64')
+    bins = np.minimum(np.searchsorted(bin_edges, uptime, side='right') - 1, uptime_sketch_bins - 1)
+    site_codes, sites = days.index.droplevel('day').factorize()
+    histograms = np.zeros((len(sites), uptime_sketch_bins), dtype='int32')
+    np.add.at(histograms, (site_codes, bins), chargers)
+    return pd.concat([sites.to_frame(index=False, name=site_cols), pd.DataFrame(histograms, columns=bin_cols)], axis=1)
+
+
+def build_uptime_sketches(partition_index, time_col='interval') -> dict:
+    """
+    Args:
+        partition_index (PartitionIndex): Index holding the observations.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+    Returns:
+        dict: {lga_name: {month: per-site uptime histograms}}
+    """
+    sketches = {}
+    for lga_name in partition_index.lga_names():
+        rebuild_uptime_sketches(sketches, partition_index,
+                                [(lga_name, month) for month in partition_index.months(lga_name)], time_col)
+    return sketches
+
+
+def rebuild_uptime_sketches(sketches: dict, partition_index, affected: list, time_col='interval'):
+    """
+    Recomputes the histograms of the given LGA and month pairs, leaving every other partition untouched.
+
+    Args:
+        sketches (dict): Sketches from build_uptime_sketches, updated in place.
+        partition_index (PartitionIndex): Index holding the current observations.
+        affected (list): (lga_name, month) pairs to recompute.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+    """
+    for lga_name, month in affected:
+        histograms = uptime_histograms(partition_index.partition(lga_name, month), time_col)
+        # replace the LGA's month dictionary in one assignment so readers never see a partial update
+        sketches[lga_name] = dict(sorted((sketches.get(lga_name, {}) | {month: histograms}).items()))
+
+
+def query_uptime_sketches(sketches: dict,
+                          lga_name: str,
+                          cpo_selected: list,
+                          start_date: pd.Timestamp,
+                          end_date: pd.Timestamp) -> pd.DataFrame:
+    """
+    Merges the histograms of the selected CPOs over the months starting in the period.
+
+    Args:
+        sketches (dict): Sketches from build_uptime_sketches.
+        lga_name (str): Local government area.
+        cpo_selected (list): Selected charge point operators.
+        start_date (pd.Timestamp): Inclusive start of the period.
+        end_date (pd.Timestamp): Exclusive end of the period.
+
+    Returns:
+        pd.DataFrame | None: One histogram per CPO, indexed by 'cpo_name', or None when no rows match.
+    """
+    start, end = start_date.tz_localize(None), end_date.tz_localize(None)
+    histograms = [histograms for month, histograms in sketches.get(lga_name, {}).items()
+                  if start <= month.start_time < end]
+    if not histograms:
+        return None
+    histograms = pd.concat(histograms, ignore_index=True)
+    histograms = histograms.loc[histograms['cpo_name'].isin(cpo_selected)]
+    if histograms.empty:
+        return None
+    return histograms.groupby('cpo_name', observed=True)[bin_cols].sum()
+
+
+def uptime_distribution(histograms: pd.DataFrame, threshold: float, quantiles=(0.05, 0.5, 0.95)) -> pd.DataFrame:
+    """
+    Quantiles of the charger-day uptimes and their share below a threshold,
+    interpolated linearly within the bins.
+
+    Args:
+        histograms (pd.DataFrame): Histograms from query_uptime_sketches.
+        threshold (float): Uptime threshold in %.
+        quantiles (tuple, optional): Quantiles to report. Defaults to (0.05, 0.5, 0.95).
+
+    Returns:
+        pd.DataFrame: 'p5', 'p50', 'p95' (per quantile), 'below_threshold' in % and
+            'charger_days', indexed like histograms.
+    """
+    counts = histograms[bin_cols].to_numpy(dtype='float64')
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1]
+    width = bin_edges[1] - bin_edges[0]
+    distribution = {}
+    for quantile in quantiles:
+        target = quantile * total
+        # first bin reaching the target rank, then the position within it
+        position = np.minimum((cumulative < target[:, None]).sum(axis=1), uptime_sketch_bins - 1)
+        rows = np.arange(len(counts))
+        below = cumulative[rows, position] - counts[rows, position]
+        within = np.divide(target - below, counts[rows, position], out=np.zeros_like(target), where=counts[rows, position] > 0)
+        distribution[f"p{quantile * 100:g}"] = bin_edges[position] + within * width
+    # whole bins below the threshold plus the part of the bin holding it
+    position = min(int(threshold // width), uptime_sketch_bins - 1)
+    below = cumulative[:, position] - counts[:, position] + counts[:, position] * (threshold - bin_edges[position]) / width
+    distribution['below_threshold'] = np.divide(below * 100, total, out=np.full_like(total, np.nan), where=total > 0)
+    distribution['charger_days'] = total.astype('int64')
+    return pd.DataFrame(distribution, index=histograms.index)
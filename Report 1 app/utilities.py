@@ -5,30 +5,15 @@ import geopandas as gpd
 import numpy as np
 import plotly.express as px
 import re
-import os
-import base64
+import json
 #import functions
 from plotly import graph_objects as go
 from config import * 
 from pathlib import Path
-from io import BytesIO
-from azure.storage.blob import BlobServiceClient
-
-# Function to convert PNG image to base64
-def convert_image_to_base64(image_file, container_name="your-container-name", local_env = True):
-    #local environment 
-    if local_env:
-        app_dir = Path(__file__).parent
-        # Path to the image in the 'img' directory
-        icon_path = app_dir / "img" / image_file
-        with open(icon_path, "rb") as image:
-            return base64.b64encode(image.read()).decode("utf-8")
-    else:
-        blob_connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        blob_service_client = BlobServiceClient.from_connection_string(blob_connection_string)
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=f"img/{image_file}")
-        blob_data = blob_client.download_blob().readall()
-        return base64.b64encode(blob_data).decode("utf-8")
+from data_store import read_status_csv, read_status_parquet, to_wide_status, status_value_cols
+from result_cache import process_data_cache
+from blob_loader import BlobLoader
+from metrics import stage_metrics
 
 # list of months for ui input values    
 def generate_month_dates(df, datetime_col):
@@ -61,28 +46,63 @@ def generate_month_dates(df, datetime_col):
     return month_dates.tolist()
 
 
-def convert_dataframe_timezone(df, datetime_col, state_col):
+def convert_dataframe_timezone(df, datetime_col, state_col, local_col=None):
     """
     Converts a DataFrame datetime column from UTC to a target timezone based on the provided state.
-    
+    The conversion is done once per state rather than once per row.
+
+    When every row's timezone has the same UTC offsets over the data's times (e.g. NSW and
+    ACT) the datetime column is converted in place. A datetime64 column cannot hold mixed
+    offsets, so when the offsets differ the datetime column is kept in UTC and the local
+    wall-clock time of each row is written to `local_col` instead.
+
     Args:
         df (pd.DataFrame): The input DataFrame.
         datetime_col (str): The name of the datetime column in the DataFrame.
         state_col (str): The name of the state column in the DataFrame.
+        local_col (str, optional): Column for the naive local times when states span
+            several timezones. Defaults to '<datetime_col>_local'.
 
     Returns:
         pd.DataFrame: DataFrame with the datetime column converted to the target timezone.
     """
     # Ensure datetime_column is in datetime format with UTC timezone
     df[datetime_col] = pd.to_datetime(df[datetime_col], utc=True)
-   
-    # Apply timezone conversion based on state
-    df[datetime_col] = df.apply(
-        lambda row: row[datetime_col].astimezone(timezone_mappings.get(row[state_col], pytz.UTC)),
-        axis=1
-    )
+
+    # Row positions for each state, states without a mapping stay in UTC
+    state_rows = df.groupby(state_col, observed=True, sort=False, dropna=False).indices
+    state_tz = {state: timezone_mappings.get(state, pytz.UTC) for state in state_rows}
+    if same_utc_offsets(set(state_tz.values()), df[datetime_col]):
+        df[datetime_col] = df[datetime_col].dt.tz_convert(next(iter(state_tz.values()), pytz.UTC))
+        return df
+
+    # Mixed timezones - keep UTC and add the local wall-clock time per state
+    utc_values = df[datetime_col].array
+    local_values = np.empty(len(df), dtype='datetime64[ns]')
+    for state, rows in state_rows.items():
+        local_values[rows] = utc_values[rows].tz_convert(state_tz[state]).tz_localize(None)
+    df[local_col or f'{datetime_col}_local'] = local_values
     return df
 
+def same_utc_offsets(timezones, utc_times) -> bool:
+    """
+    Checks whether timezones agree on the UTC offset at every given time, so the
+    times read the same on the wall clock in each of them.
+
+    Args:
+        timezones (set): Timezones to compare.
+        utc_times (pd.Series): UTC datetimes.
+
+    Returns:
+        bool: True when there is at most one distinct set of offsets.
+    """
+    if len({str(tz) for tz in timezones}) <= 1:
+        return True
+    times = pd.DatetimeIndex(utc_times.unique())
+    utc_wall = times.tz_localize(None).asi8
+    offsets = {(times.tz_convert(tz).tz_localize(None).asi8 - utc_wall).tobytes() for tz in timezones}
+    return len(offsets) == 1
+
 def clean_string(value):
     """
     Removes non-permitted characters from a string.
@@ -100,19 +120,30 @@ def clean_string(value):
     cleaned_value = re.sub(permitted_pattern, '', value)
     return cleaned_value
 
-def load_and_prepare_data(local_env = True,container_name="your-container-name"):
+def load_and_prepare_data(local_env = True,container_name="your-container-name", data_dir = None, warehouse = None):
     """
     Loads and prepares data files stored in Azure Blob Storage.
     Parameters:
     local_env (bool): A flag to determine the programming environment 
+    data_dir (str | Path): Directory of the local files, defaults to the app directory
+    warehouse (StatusWarehouse): Local warehouse holding the observations, only one row per site
+        and month is loaded from it in place of the observations
     Returns:
         Tuple containing DataFrames and dictionaries used in the app.
     """
     ##### Local Environment
     if local_env:
         # Load data and compute static values
-        app_dir = Path(__file__).parent
-        months_data = pd.read_csv(app_dir / "final_processed_data.csv")
+        app_dir = Path(data_dir) if data_dir is not None else Path(__file__).parent
+        # prefer the typed columnar copy written by data_store.py
+        with stage_metrics.timer('load.read') as stage:
+            if warehouse is not None:
+                months_data = warehouse.site_months()
+            elif (app_dir / "final_processed_data.parquet").exists():
+                months_data = read_status_parquet(app_dir / "final_processed_data.parquet")
+            else:
+                months_data = read_status_csv(app_dir / "final_processed_data.csv")
+            stage.rows = len(months_data)
         #load geojson - lga
         geodf_filter_lga = gpd.read_file(app_dir / 'geodf_lga_filter.json')
         geodf_filter_lga.set_index('LGA_name',inplace = True)
@@ -124,129 +155,296 @@ def load_and_prepare_data(local_env = True,container_name="your-container-name")
         
     ##### Cloud Environment
     else:
-    # Retrieve Azure Blob Storage connection details
-        blob_connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        container_name = os.getenv("AZURE_CONTAINER_NAME", container_name)
-        
-        # Initialize Blob Service Client
-        blob_service_client = BlobServiceClient.from_connection_string(blob_connection_string)
-        
-        # Function to download and read a blob file as a DataFrame
-        def download_blob_to_dataframe(blob_name, is_geojson=False):
-            try:
-                blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-                blob_data = blob_client.download_blob().readall()
-                if is_geojson:
-                    return gpd.read_file(BytesIO(blob_data))
-                return pd.read_csv(BytesIO(blob_data))
-            except Exception as e:
-                print(f"Error downloading blob {blob_name}: {e}")
-                return pd.DataFrame()  # Return an empty DataFrame or handle as needed
-        
-        # Download CSV and GeoJSON files
-        months_data = download_blob_to_dataframe("final_processed_data.csv")
-        geodf_filter_lga = download_blob_to_dataframe("geodf_lga_filter.json", is_geojson=True).set_index('LGA_name')
-        geodf_filter_poa = download_blob_to_dataframe("geodf_poa_filter.json", is_geojson=True).set_index('postcode')
-        lga_geogcoord_df = download_blob_to_dataframe("lga_geogcoord_df.csv")
+    # Download the blobs concurrently into the local disk cache, unchanged blobs are not downloaded again
+        blob_loader = BlobLoader(container_name=container_name)
+        with stage_metrics.timer('load.download'):
+            blob_paths = blob_loader.fetch_all(["final_processed_data.parquet",
+                                                "geodf_lga_filter.json",
+                                                "geodf_poa_filter.json",
+                                                "lga_geogcoord_df.csv"])
+        # parse straight from the cached files
+        with stage_metrics.timer('load.read') as stage:
+            if blob_paths["final_processed_data.parquet"] is not None:
+                months_data = read_status_parquet(blob_paths["final_processed_data.parquet"])
+            else:
+                months_data = read_status_csv(blob_loader.fetch("final_processed_data.csv"))
+            stage.rows = len(months_data)
+        geodf_filter_lga = gpd.read_file(blob_paths["geodf_lga_filter.json"]).set_index('LGA_name')
+        geodf_filter_poa = gpd.read_file(blob_paths["geodf_poa_filter.json"]).set_index('postcode')
+        lga_geogcoord_df = pd.read_csv(blob_paths["lga_geogcoord_df.csv"])
     
+    # one row per site and interval, before the timezone conversion so it touches fewer rows
+    if warehouse is None:
+        with stage_metrics.timer('load.wide') as stage:
+            stage.rows = len(months_data)
+            months_data = to_wide_status(months_data)
     # Apply timezone conversion
-    months_data = convert_dataframe_timezone(months_data, 'interval', 'state')
+    with stage_metrics.timer('load.timezone') as stage:
+        stage.rows = len(months_data)
+        months_data = convert_dataframe_timezone(months_data, 'interval', 'state')
     
     # LGA and lon lat coords
-    lga_geogcoord_dict = {
-    row['lga_name']: {  # Outer dictionary key from col1
-        'lat': row['lat'],  # Inner dictionary key from col2
-        'lon': row['lon']   # Inner dictionary key from col3
-    }
-    for _, row in lga_geogcoord_df.iterrows()
-    }
+    lga_geogcoord_dict = {lga_name: {'lat': lat, 'lon': lon}
+                          for lga_name, lat, lon in zip(lga_geogcoord_df['lga_name'], lga_geogcoord_df['lat'], lga_geogcoord_df['lon'])}
     # postcode and suburb dictionary
-    poa_suburb = { row['postcode']:row['address2'] for _,row in months_data[['postcode','address2']].drop_duplicates().iterrows() }
+    postcode_suburbs = months_data[['postcode','address2']].drop_duplicates()
+    poa_suburb = dict(zip(postcode_suburbs['postcode'], postcode_suburbs['address2']))
+    # results computed from previously loaded data are stale
+    process_data_cache.invalidate()
     
     return months_data, lga_geogcoord_dict, poa_suburb, geodf_filter_lga, geodf_filter_poa
 
 
-# Process Dataframe based on filters
-def process_data(df: pd.DataFrame,
-                 agg_cols: list,
-                 interval_option: object,
-                 combine_cols: bool,
-                 time_col = 'interval',
-                 var_col = 'variable') -> pd.DataFrame:
-    """_summary_
+# Status count columns present in long- or wide-format observations
+def status_columns(df: pd.DataFrame, var_col = 'variable') -> list:
+    """
+    Args:
+        df (pd.DataFrame): Long- or wide-format status observations.
+        var_col (str, optional): Name of the status column of the long layout. Defaults to 'variable'.
+
+    Returns:
+        list: Status count columns, including 'Total' and 'evse_port_site_count'.
+    """
+    if var_col in df.columns:
+        return list(df[var_col].unique())
+    return [col for col in df.columns if col in status_value_cols]
+
+# Sum long-format status rows and pivot to one column per status
+def pivot_status_data(df: pd.DataFrame,
+                      agg_cols: list,
+                      time_col = 'interval',
+                      var_col = 'variable',
+                      dropna = True) -> pd.DataFrame:
+    """
+    Sums the long-format status observations on the aggregation columns and
+    converts them to wide form with one column of counts per status. Wide
+    observations (no var_col column) are only summed.
 
     Args:
-        df (pd.DataFrame): _description_
-        agg_cols (list): _description_
-        interval_option (object): _description_
-        combine_cols (bool): _description_
-        time_col (str, optional): _description_. Defaults to 'interval'.
-        status_col (str, optional): _description_. Defaults to 'variable'.
+        df (pd.DataFrame): Long- or wide-format status observations.
+        agg_cols (list): Columns to aggregate on (in addition to the time column).
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+        var_col (str, optional): Name of the status column. Defaults to 'variable'.
+        dropna (bool, optional): Drop rows with missing aggregation keys. Defaults to True.
 
     Returns:
-        pd.DataFrame: _description_
+        pd.DataFrame: Wide counts, one row per aggregation key and interval.
     """
-    status_cols = [col for col in df.variable.unique() if col != 'evse_port_site_count']    
+    if var_col not in df.columns:
+        # min_count keeps a status missing from every row missing, as the pivot would
+        value_cols = [col for col in df.columns if col in status_value_cols]
+        # counts are stored downcast, widen them so the sums cannot overflow
+        widened = {col: 'int64' if pd.api.types.is_integer_dtype(df[col]) else 'float64' for col in value_cols}
+        return (df[agg_cols+[time_col]+value_cols].astype(widened)
+                .groupby(agg_cols+[time_col], observed=True, dropna=dropna)[value_cols]
+                .sum(min_count=1)
+                .reset_index())
     # aggregate data on agg list cols
-    df_edit = (df.groupby(agg_cols+[time_col,var_col])['value'].sum().reset_index())
+    df_edit = (df.groupby(agg_cols+[time_col,var_col], observed=True, dropna=dropna)['value'].sum().reset_index())
     # list indexing cols
-    index_cols = [col for col in df_edit.columns if col not in ['value','variable']]
+    index_cols = [col for col in df_edit.columns if col not in ['value',var_col]]
     # Convert summary data to wide form
-    df_edit = df_edit.pivot(index = index_cols, columns = var_col, values = 'value')         
-    df_edit = df_edit.reset_index() 
-    # check to combine status columns
-    if combine_cols:
-        # Engineer variables - combined columns
-        df_edit['in_use'] = (df_edit['Charging'] +
-                            df_edit['Finishing'] +
-                            df_edit['Reserved'])
-        
-        df_edit['unavailable_out_of_order'] = (df_edit['Unavailable'] +
-                                            df_edit['Out of order'])
-        
-        df_edit = df_edit.drop(columns = ['Charging',
-                                        'Finishing',
-                                        'Reserved',
-                                        'Unavailable',
-                                        'Out of order'])
-        status_cols = ['in_use','unavailable_out_of_order','Available','Unknown','Total']
+    df_edit = df_edit.pivot(index = index_cols, columns = var_col, values = 'value')
+    return df_edit.reset_index()
+
+def combine_status_columns(df_edit: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combines the wide status counts into the dashboard's status groups.
+
+    Args:
+        df_edit (pd.DataFrame): Wide counts from pivot_status_data.
+
+    Returns:
+        pd.DataFrame: Wide counts with 'in_use' and 'unavailable_out_of_order' replacing their parts.
+    """
+    # Engineer variables - combined columns
+    df_edit['in_use'] = (df_edit['Charging'] +
+                        df_edit['Finishing'] +
+                        df_edit['Reserved'])
+
+    df_edit['unavailable_out_of_order'] = (df_edit['Unavailable'] +
+                                        df_edit['Out of order'])
+
+    return df_edit.drop(columns = ['Charging',
+                                   'Finishing',
+                                   'Reserved',
+                                   'Unavailable',
+                                   'Out of order'])
+
+def resample_status_data(df_edit: pd.DataFrame,
+                         agg_cols: list,
+                         status_cols: list,
+                         interval_option: object,
+                         time_col = 'interval',
+                         dropna = True) -> pd.DataFrame:
+    """
+    Resamples wide status counts to the selected interval and converts them to
+    percentages of the 'Total' column.
+
+    Args:
+        df_edit (pd.DataFrame): Wide counts, one row per aggregation key and interval.
+        agg_cols (list): Columns to aggregate on.
+        status_cols (list): Status count columns, including 'Total'.
+        interval_option (object): pandas resample rule, e.g. '60min' or 'ME'.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+        dropna (bool, optional): Drop groups with missing keys. Defaults to True.
+
+    Returns:
+        pd.DataFrame: Status percentages per aggregation key and resampled interval.
+    """
     #### Aggregate over different intervals
     df_edit_resampled = df_edit.set_index(time_col)
     df_edit_resampled = (
         df_edit_resampled
-        .groupby(agg_cols+['evse_port_site_count'])[status_cols]
+        .groupby(agg_cols+['evse_port_site_count'], observed=True, dropna=dropna)[status_cols]
         .resample(interval_option)
         .sum()
         .reset_index()
-    )   
+    )
     # Form proportion of Total column
-    for col in status_cols:
-        df_edit_resampled.loc[:,col] = np.round(df_edit_resampled[col]*100 / df_edit_resampled['Total'],2)
-        processed_data = df_edit_resampled.drop(columns=['Total'])
-    
-    return processed_data  
- 
+    df_edit_resampled[status_cols] = np.round(
+        df_edit_resampled[status_cols].mul(100).div(df_edit_resampled['Total'], axis=0), 2)
+    return df_edit_resampled.drop(columns=['Total'])
+
+# Process Dataframe based on filters
+def process_data(df: pd.DataFrame,
+                 agg_cols: list,
+                 interval_option: object,
+                 combine_cols: bool,
+                 time_col = 'interval',
+                 var_col = 'variable') -> pd.DataFrame:
+    """
+    Aggregates long-format status observations on the given columns and time interval.
+
+    Args:
+        df (pd.DataFrame): Long- or wide-format status observations.
+        agg_cols (list): Columns to aggregate on.
+        interval_option (object): pandas resample rule, e.g. '60min' or 'ME'.
+        combine_cols (bool): Combine the statuses into the dashboard's status groups.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+        var_col (str, optional): Name of the status column. Defaults to 'variable'.
+
+    Returns:
+        pd.DataFrame: Status percentages per aggregation key and resampled interval.
+    """
+    status_cols = [col for col in status_columns(df, var_col) if col != 'evse_port_site_count']
+    df_edit = pivot_status_data(df, agg_cols, time_col, var_col)
+    # check to combine status columns
+    if combine_cols:
+        df_edit = combine_status_columns(df_edit)
+        status_cols = combined_status_cols
+    return resample_status_data(df_edit, agg_cols, status_cols, interval_option, time_col)
+
+# Process Dataframe for several aggregation levels at once
+def process_data_grouping_sets(df: pd.DataFrame,
+                               grouping_sets: list,
+                               interval_option: object,
+                               combine_cols: bool,
+                               time_col = 'interval',
+                               var_col = 'variable') -> list:
+    """
+    Equivalent of calling process_data once per grouping set, computed with a
+    single pivot and a single resample.
+
+    The long-format rows are pivoted once on the union of the grouping set columns.
+    Each grouping set is summed down from that pivot, the sets are stacked and
+    resampled together, then split back apart. As in process_data, the summed
+    'evse_port_site_count' of each row is part of the resample key.
+
+    Args:
+        df (pd.DataFrame): Long- or wide-format status observations.
+        grouping_sets (list): List of aggregation column lists, e.g. [['cpo_name'], ['postcode']].
+        interval_option (object): pandas resample rule, e.g. '60min' or 'ME'.
+        combine_cols (bool): Combine the statuses into the dashboard's status groups.
+        time_col (str, optional): Name of the time column. Defaults to 'interval'.
+        var_col (str, optional): Name of the status column. Defaults to 'variable'.
+
+    Returns:
+        list: One DataFrame of status percentages per grouping set, in the same order.
+    """
+    status_cols = [col for col in status_columns(df, var_col) if col != 'evse_port_site_count']
+    # union of the grouping set columns, in first-seen order
+    union_cols = list(dict.fromkeys(col for agg_cols in grouping_sets for col in agg_cols))
+    # one pivot at the finest grain, keeping missing keys for the coarser sets
+    df_base = pivot_status_data(df, union_cols, time_col, var_col, dropna=False)
+    count_cols = [col for col in df_base.columns if col not in union_cols+[time_col]]
+    set_frames = []
+    for set_id, agg_cols in enumerate(grouping_sets):
+        if list(agg_cols) == union_cols:
+            df_edit = df_base
+        else:
+            # min_count keeps a status missing from every row missing, as the pivot would
+            df_edit = (df_base
+                       .groupby(agg_cols+[time_col], observed=True)[count_cols]
+                       .sum(min_count=1)
+                       .reset_index())
+        if combine_cols:
+            df_edit = combine_status_columns(df_edit)
+        set_frames.append(df_edit
+                          .dropna(subset=agg_cols+['evse_port_site_count'])
+                          .assign(grouping_set=set_id))
+    if combine_cols:
+        status_cols = combined_status_cols
+    # one resample over all grouping sets, the set id keeps them apart
+    df_resampled = resample_status_data(pd.concat(set_frames, ignore_index=True),
+                                        ['grouping_set']+union_cols,
+                                        status_cols,
+                                        interval_option,
+                                        time_col,
+                                        dropna=False)
+    processed_data = []
+    for set_id, agg_cols in enumerate(grouping_sets):
+        output_cols = agg_cols+['evse_port_site_count', time_col]+[col for col in status_cols if col != 'Total']
+        processed_data.append(df_resampled
+                              .loc[df_resampled['grouping_set'] == set_id, output_cols]
+                              .sort_values(agg_cols+['evse_port_site_count'], kind='stable')
+                              .reset_index(drop=True))
+    return processed_data
+
+# Value box statistics of every CPO
+def cpo_kpis(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Uptime, utilisation, unavailability and charger count per CPO, in one grouped pass.
+
+    Args:
+        df (pd.DataFrame): CPO level data from process_data with combined status columns.
+
+    Returns:
+        pd.DataFrame: One row per CPO, indexed by 'cpo_name'.
+    """
+    return (df.assign(uptime = df['in_use'] + df['Available'])
+            .groupby('cpo_name', observed=True)
+            .agg(average_uptime = ('uptime', 'mean'),
+                 minimum_uptime = ('uptime', 'min'),
+                 average_utilisation = ('in_use', 'mean'),
+                 maximum_unavailability = ('unavailable_out_of_order', 'max'),
+                 average_unavailability = ('unavailable_out_of_order', 'mean'),
+                 evse_count = ('evse_port_site_count', 'max'))
+            )
+
 #helper function to plot chloropleth map
 def plot_chloropleth_map(df1: pd.DataFrame,
                          df2: pd.DataFrame,
-                         geo_df:pd.DataFrame,
+                         geojson: dict,
                          lga_geogcoord_dict: dict,
                          status_prop: str,
                          lga_name: str,
-                         poa_suburb: dict
+                         poa_suburb: dict,
+                         zoom: float = 8
                          ) -> go.Figure:
     """_summary_
     Args:
         df (pd.DataFrame): _description_
-        geo_df (pd.Dataframe): _description_
+        geojson (dict): postcode polygons of the LGA, from GeometryService.geojson
         lga_geogcoord_dict (dict): _description_
         status_prop (str): _description_
+        zoom (float, optional): map zoom. Defaults to 8.
     Returns:
         object: _description_
     """
     
-     # Add 'suburb_name' column by mapping 'postcode' to 'poa_suburb'
-    df1['suburb_name'] = df1['postcode'].map(poa_suburb)
+    # suburb names for the hover text, df1 is shared through the result cache so it is not modified
+    suburb_name = df1['postcode'].map(poa_suburb).rename('suburb_name')
     
     color_scale = {"in_use": "Greens", "Available": "Blues", "unavailable_out_of_order": "Reds"}.get(status_prop)
     if status_prop == "in_use":
@@ -261,13 +459,13 @@ def plot_chloropleth_map(df1: pd.DataFrame,
                        
     map_fig = px.choropleth_mapbox(
             df1,
-            geojson = geo_df.geometry,
+            geojson = geojson,
             locations = 'postcode',
             color = status_prop,
             color_continuous_scale = color_scale,
             range_color = range_color,
             labels = utilisation_status | var_labels,
-            hover_name = 'suburb_name',
+            hover_name = suburb_name,
             hover_data={"evse_port_site_count": True,
                         'postcode': True,
                         'in_use':True,
@@ -277,7 +475,7 @@ def plot_chloropleth_map(df1: pd.DataFrame,
             center=lga_geogcoord_dict[lga_name], #center of Australia
             #mapbox_style="open-street-map",
             mapbox_style="carto-positron",
-            zoom=8,
+            zoom=zoom,
         )
       # Hide color bar in choropleth
     map_fig.update_layout(coloraxis_showscale=False)
@@ -306,10 +504,83 @@ def plot_chloropleth_map(df1: pd.DataFrame,
     
     return map_fig
 
-# Adding a custom function for week of the month calculation
-def week_of_month(date):
-    first_day = date.replace(day=1)
-    return (date.day - 1) // 7 + 1
+# Widget for a figure serialised with fig.to_json()
+def figure_widget(payload: str) -> go.FigureWidget:
+    """
+    Args:
+        payload (str): Figure JSON, e.g. from figure_cache.
+
+    Returns:
+        go.FigureWidget: Widget rebuilt without Plotly's validation, the payload came from a valid figure.
+    """
+    return go.FigureWidget(json.loads(payload), _validate=False)
+
+#helper function to restyle a rendered chloropleth map in place
+def update_chloropleth_map(map_widget: go.FigureWidget, map_fig: go.Figure):
+    """
+    Copies the data, hover text and colour axis of a newly built map into a rendered
+    map widget. The widget's geojson is left untouched, so only the changed values
+    are sent to the browser.
+    Args:
+        map_widget (go.FigureWidget): rendered map
+        map_fig (go.Figure): map built by plot_chloropleth_map, its geojson can be empty
+    """
+    with map_widget.batch_update():
+        for trace, new_trace in zip(map_widget.data, map_fig.data):
+            trace.update({key: value for key, value in new_trace.to_plotly_json().items()
+                          if key not in ('geojson', 'type', 'uid')})
+        map_widget.layout.coloraxis = map_fig.layout.coloraxis
+
+# Period number of each interval for the column graph
+def period_number(interval: pd.Series, interval_option: str, selected_period: tuple) -> pd.Series:
+    """
+    Extracts the period number (hour, day, week of the month, ...) for the interval option.
+    Only the selected extraction is computed, once per distinct interval.
+
+    Args:
+        interval (pd.Series): Datetime column.
+        interval_option (str): Interval option key.
+        selected_period (tuple): Selected (start, end) months, the first month is numbered 1.
+
+    Returns:
+        pd.Series: 'period_number' aligned with interval.
+    """
+    codes, uniques = pd.factorize(interval)
+    dt = pd.Series(uniques).dt
+    # Define a mapping for interval options to datetime attributes
+    interval_extraction = {
+        "60min": lambda: dt.hour + 1,  # Extract hour of day
+        "1440min": lambda: dt.dayofweek + 1,  # Extract day of the week
+        "10080min": lambda: (dt.day - 1) // 7 + 1,  # Extract week of the month
+        "ME": lambda: dt.month - selected_period[0] + 1,  # Extract month
+        "Q": lambda: dt.quarter,  # Extract quarter
+        "Y": lambda: dt.year  # Extract year
+    }
+    numbers = interval_extraction.get(interval_option, lambda: dt.hour)().to_numpy()
+    return pd.Series(numbers[codes], index=interval.index, name='period_number')
+
+# Bars of the column graph, independent of the threshold
+def column_graph_data(df1: pd.DataFrame, status_prop: str, interval_option: str, selected_period: tuple) -> pd.DataFrame:
+    """
+    Mean, standard deviation and standard error of a status property per CPO and period number.
+
+    Args:
+        df1 (pd.DataFrame): Input data containing 'cpo_name', 'interval' and 'status_prop' columns.
+        status_prop (str): Column name for the status property.
+        interval_option (str): Interval option key for grouping the data.
+        selected_period (tuple): Selected (start, end) months.
+
+    Returns:
+        pd.DataFrame: One row per CPO and period number.
+    """
+    # period number of each row, kept out of df1 as it is shared through the result cache
+    plot_data = (df1[status_prop]
+                 .groupby([df1['cpo_name'], period_number(df1['interval'], interval_option, selected_period)], observed=True)
+                 .agg(mean_status = 'mean',  std_status = 'std', count_status = 'count')
+                 .reset_index()
+                 )
+    plot_data['std_err'] = plot_data['std_status']/np.sqrt(plot_data['count_status'])
+    return plot_data
 
 #helper function to plot chloropleth map
 def plot_column_graph(df1: pd.DataFrame,
@@ -317,6 +588,7 @@ def plot_column_graph(df1: pd.DataFrame,
                       threshold: int,
                       interval_option: str,
                       selected_period: tuple,
+                      plot_data: pd.DataFrame = None,
                       ) -> go.Figure:
     """
     Plots a bar graph showing the mean and standard deviation of a specified status property 
@@ -327,31 +599,14 @@ def plot_column_graph(df1: pd.DataFrame,
         status_prop (str): Column name for the status property to be plotted.
         threshold (int): Threshold value for the horizontal line.
         interval_option (str): Interval option key for grouping the data.
+        plot_data (pd.DataFrame, optional): Bars from column_graph_data, computed from df1 when None.
 
     Returns:
         go.Figure: A Plotly Figure object with the bar chart and threshold line.
     """
-    
-    # Ensure your DataFrame is sorted by 'cpo_name' and 'interval' (or any other ordering you prefer)
-    df1 = df1.sort_values(by=['cpo_name', 'interval'])
-    # Define a mapping for interval options to datetime attributes
-    interval_extraction = {
-        "60min": df1['interval'].dt.hour + 1,  # Extract hour of day
-        "1440min": df1['interval'].dt.dayofweek + 1,  # Extract day of the week
-        "10080min": df1['interval'].apply(week_of_month),  # Extract week of the month
-        "ME": df1['interval'].dt.month - selected_period[0] + 1,  # Extract month
-        "Q": df1['interval'].dt.quarter,  # Extract quarter
-        "Y": df1['interval'].dt.year  # Extract year
-    }  
-    # Use groupby and cumcount to generate a sequential number for each unique 'interval' within each 'cpo_name' group
-    df1['period_number'] = interval_extraction.get(interval_option, df1['interval'].dt.hour)
     # plot average across period number
-    plot_data = (df1
-                 .groupby(['cpo_name','period_number'])[status_prop]
-                 .agg(mean_status = 'mean',  std_status = 'std', count_status = 'count')
-                 .reset_index()
-                 )
-    plot_data['std_err'] = plot_data['std_status']/np.sqrt(plot_data['count_status'])
+    if plot_data is None:
+        plot_data = column_graph_data(df1, status_prop, interval_option, selected_period)
     label = {'period_number':interval_options2[interval_option],status_prop: f'Mean {status_prop}', 'mean_status':'Average value'}    
     
     col_fig = px.bar(
@@ -400,7 +655,7 @@ def plot_column_graph(df1: pd.DataFrame,
         y=threshold*0.95,
         xref="paper",  # x is relative to the plot width
         yref="y",  # y is on the y-axis scale
-        text=f"Threshold: {threshold: 0.1f}%",
+        text=threshold_text(threshold),
         showarrow=False,
         font=dict(color="red"),
         align="center",
@@ -413,4 +668,20 @@ def plot_column_graph(df1: pd.DataFrame,
         tickmode="linear",
         
     )
-    return col_fig
\ No newline at end of file
+    return col_fig
+
+def threshold_text(threshold) -> str:
+    return f"Threshold: {threshold: 0.1f}%"
+
+# helper function to move the threshold line of a rendered column graph
+def update_column_graph_threshold(graph_widget, threshold):
+    """
+    Moves the threshold line and its annotation without redrawing the bars.
+
+    Args:
+        graph_widget (go.FigureWidget): Rendered column graph.
+        threshold (int): Threshold value.
+    """
+    with graph_widget.batch_update():
+        graph_widget.layout.shapes[0].update(y0=threshold, y1=threshold)
+        graph_widget.layout.annotations[0].update(y=threshold*0.95, text=threshold_text(threshold))
\ No newline at end of file
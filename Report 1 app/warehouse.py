@@ -0,0 +1,304 @@
+#warehouse.py
+#import module
+import argparse
+import shutil
+import duckdb
+import pandas as pd
+#import functions
+from pathlib import Path
+from config import *
+from data_store import status_value_cols, sort_categories, is_stale
+from status_events import site_cols
+from utilities import combine_status_columns, resample_status_data, convert_dataframe_timezone
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def connect(memory_limit=warehouse_memory_limit, threads=warehouse_threads) -> duckdb.DuckDBPyConnection:
+    """
+    Returns:
+        duckdb.DuckDBPyConnection: In-process DuckDB connection, spilling to a temporary
+            directory when a query needs more than memory_limit.
+    """
+    connection = duckdb.connect(config={'memory_limit': memory_limit, 'threads': threads})
+    # casts between TIMESTAMPTZ and the stored naive UTC intervals use the session time zone,
+    # which defaults to the host's; without the ICU extension they are always UTC
+    try:
+        connection.execute("SET TimeZone = 'UTC'")
+    except duckdb.Error:
+        pass
+    return connection
+
+
+def utc_naive(timestamp) -> pd.Timestamp:
+    # intervals are stored as naive UTC timestamps, which need no time zone extension
+    return pd.Timestamp(timestamp).tz_convert('UTC').tz_localize(None)
+
+
+def utc_naive_index(timestamps) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(timestamps).tz_convert('UTC').tz_localize(None)
+
+
+def build_warehouse(source, directory=warehouse_dir, memory_limit=warehouse_memory_limit, threads=warehouse_threads) -> Path:
+    """
+    Converts long-format status observations into the wide layout, as Parquet
+    files partitioned by month. Rows are sorted by LGA, CPO and interval, so the
+    row group statistics let queries skip everything outside the selection.
+
+    The conversion runs in DuckDB, so the source does not have to fit in memory.
+    Partitioned writes do not keep the row order, so each month is pivoted to a
+    staging directory first and then sorted into its final file.
+
+    Args:
+        source (str | Path): Long-format Parquet or CSV file, or a glob of them.
+        directory (str | Path, optional): Output directory. Defaults to config.warehouse_dir.
+
+    Returns:
+        Path: The output directory.
+    """
+    directory = Path(directory)
+    staging_dir = directory / "_staging"
+    directory.mkdir(parents=True, exist_ok=True)
+    reader = 'read_csv' if str(source).endswith('.csv') else 'read_parquet'
+    statuses = ",\n".join(f"SUM(value) FILTER (WHERE variable = '{status}')::INTEGER AS {quote(status)}"
+                          for status in status_value_cols)
+    with connect(memory_limit, threads) as connection:
+        connection.execute(f"""
+            COPY (
+                SELECT {', '.join(map(quote, site_cols))},
+                       interval::TIMESTAMP AS interval,
+                       strftime(interval::TIMESTAMP, '%Y-%m') AS month,
+                       {statuses}
+                FROM {reader}(?)
+                GROUP BY ALL
+            ) TO '{staging_dir.as_posix()}' (FORMAT parquet, PARTITION_BY (month), OVERWRITE_OR_IGNORE)
+            """, [str(source)])
+        for month_dir in sorted(staging_dir.glob('month=*')):
+            (directory / month_dir.name).mkdir(parents=True, exist_ok=True)
+            connection.execute(f"""
+                COPY (
+                    SELECT * EXCLUDE (month) FROM read_parquet('{(month_dir / '*.parquet').as_posix()}')
+                    ORDER BY lga_name, cpo_name, interval
+                ) TO '{(directory / month_dir.name / 'data.parquet').as_posix()}' (FORMAT parquet, COMPRESSION zstd)
+                """)
+    shutil.rmtree(staging_dir)
+    return directory
+
+
+class StatusWarehouse:
+    """
+    Out-of-core query backend over the Parquet files written by build_warehouse.
+
+    Filtering, projection and the status sums of process_data run in DuckDB,
+    which prunes month partitions and row groups outside the LGA, CPO and period.
+    Only the per-interval sums of the selection are returned. They are then
+    combined and resampled by the same pandas functions as process_data.
+
+    Safe to query from several threads, each query gets its own cursor.
+    """
+
+    def __init__(self, directory=warehouse_dir, memory_limit=warehouse_memory_limit, threads=warehouse_threads):
+        self.directory = Path(directory)
+        self.connection = connect(memory_limit, threads)
+        # the glob is expanded per query, so new partitions are picked up without reopening
+        self.connection.execute(f"""
+            CREATE VIEW observations AS
+            SELECT * FROM read_parquet('{(self.directory / 'month=*' / '*.parquet').as_posix()}',
+                                       hive_partitioning = true, hive_types = {{'month': VARCHAR}})
+            """)
+
+    def query(self, sql: str, params: list = None) -> pd.DataFrame:
+        # through Arrow, strings arrive as categoricals like the in-memory data
+        with self.connection.cursor() as cursor:
+            return sort_categories(cursor.execute(sql, params or []).fetch_arrow_table().to_pandas(strings_to_categorical=True))
+
+    def files(self) -> list:
+        """
+        Returns:
+            list: Paths of the month files.
+        """
+        return sorted(self.directory.glob('month=*/*.parquet'))
+
+    def append(self, new_rows: pd.DataFrame) -> list:
+        """
+        Adds new wide observations, replacing stored rows of the same site and
+        interval. Only the months receiving rows are rewritten, each to a temporary
+        file that then replaces the month's file, so a running query reads either
+        the old or the new file whole.
+
+        Args:
+            new_rows (pd.DataFrame): Typed, timezone converted status observations.
+
+        Returns:
+            list: (lga_name, month) partitions that changed.
+        """
+        rows = new_rows[site_cols].assign(interval=utc_naive_index(new_rows['interval']))
+        rows['month'] = rows['interval'].dt.strftime('%Y-%m')
+        for status in status_value_cols:
+            rows[status] = new_rows[status].astype('Int32') if status in new_rows else pd.NA
+        columns = ', '.join(map(quote, site_cols + ['interval']))
+        statuses = ', '.join(f"{quote(status)}::INTEGER AS {quote(status)}" for status in status_value_cols)
+        with self.connection.cursor() as cursor:
+            cursor.register('new_rows', rows)
+            for month in sorted(rows['month'].unique()):
+                month_dir = self.directory / f"month={month}"
+                month_dir.mkdir(exist_ok=True)
+                current = [f"SELECT {columns}, {statuses}, 0 AS source FROM read_parquet('{path.as_posix()}')"
+                           for path in sorted(month_dir.glob('*.parquet'))]
+                # the newest row of each site and interval is kept
+                cursor.execute(f"""
+                    COPY (
+                        SELECT * EXCLUDE (source) FROM (
+                            {' UNION ALL '.join(current + [f"SELECT {columns}, {statuses}, 1 AS source FROM new_rows WHERE month = ?"])}
+                        )
+                        QUALIFY row_number() OVER (PARTITION BY {', '.join(map(quote, site_cols))}, interval ORDER BY source DESC) = 1
+                        ORDER BY lga_name, cpo_name, interval
+                    ) TO '{(month_dir / 'data.parquet.tmp').as_posix()}' (FORMAT parquet, COMPRESSION zstd)
+                    """, [month])
+                for path in month_dir.glob('*.parquet'):
+                    if path.name != 'data.parquet':
+                        path.unlink()
+                (month_dir / 'data.parquet.tmp').replace(month_dir / 'data.parquet')
+            cursor.unregister('new_rows')
+        return list(rows.groupby(['lga_name', pd.PeriodIndex(rows['interval'], freq='M')], observed=True).indices)
+
+    def site_months(self) -> pd.DataFrame:
+        """
+        One row per site and month with the site's first interval of the month, in
+        place of the observations when deriving the dashboard's selection lists.
+
+        Returns:
+            pd.DataFrame: Site columns and a UTC 'interval'.
+        """
+        site_months = self.query(f"""
+            SELECT {', '.join(map(quote, site_cols))}, MIN(interval) AS interval
+            FROM observations
+            GROUP BY {', '.join(map(quote, site_cols))}, month
+            ORDER BY lga_name, cpo_name, interval
+            """)
+        site_months['interval'] = site_months['interval'].dt.tz_localize('UTC')
+        return site_months
+
+    def pivot(self,
+              lga_name: str,
+              cpo_selected: list,
+              start_date: pd.Timestamp,
+              end_date: pd.Timestamp,
+              grouping_sets: list,
+              time_col='interval') -> list:
+        """
+        Sums the selected observations per grouping set and interval, the
+        equivalent of pivot_status_data on the filtered rows, in one scan.
+
+        Args:
+            lga_name (str): Local government area.
+            cpo_selected (list): Selected charge point operators.
+            start_date (pd.Timestamp): Inclusive start of the period (tz-aware).
+            end_date (pd.Timestamp): Exclusive end of the period (tz-aware).
+            grouping_sets (list): List of aggregation column lists.
+            time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+        Returns:
+            list: Wide counts per grouping set with the LGA's 'state', in the same order.
+        """
+        union_cols = list(dict.fromkeys(col for agg_cols in grouping_sets for col in agg_cols))
+        sets = ", ".join("(" + ", ".join(map(quote, agg_cols + [time_col])) + ")" for agg_cols in grouping_sets)
+        sums = ", ".join(f"SUM({quote(status)})::BIGINT AS {quote(status)}" for status in status_value_cols)
+        df_sets = self.query(f"""
+            SELECT {', '.join(map(quote, union_cols + [time_col]))},
+                   GROUPING({', '.join(map(quote, union_cols))}) AS grouping_id,
+                   ANY_VALUE(state) AS state,
+                   {sums}
+            FROM observations
+            WHERE lga_name = ?
+              AND list_contains(?, cpo_name)
+              AND {quote(time_col)} >= ? AND {quote(time_col)} < ?
+              AND month BETWEEN ? AND ?
+            GROUP BY GROUPING SETS ({sets})
+            """, [lga_name, list(cpo_selected), utc_naive(start_date), utc_naive(end_date),
+                  utc_naive(start_date).strftime('%Y-%m'), utc_naive(end_date).strftime('%Y-%m')])
+        df_sets[time_col] = df_sets[time_col].dt.tz_localize('UTC')
+        pivoted = []
+        for agg_cols in grouping_sets:
+            # GROUPING() sets a bit, first column highest, for each column rolled up
+            grouping_id = sum(1 << (len(union_cols) - 1 - position)
+                              for position, col in enumerate(union_cols) if col not in agg_cols)
+            pivoted.append(df_sets
+                           .loc[df_sets['grouping_id'] == grouping_id, agg_cols + [time_col, 'state'] + status_value_cols]
+                           .dropna(subset=agg_cols)
+                           .reset_index(drop=True))
+        return pivoted
+
+    def process_data_grouping_sets(self,
+                                   lga_name: str,
+                                   cpo_selected: list,
+                                   start_date: pd.Timestamp,
+                                   end_date: pd.Timestamp,
+                                   grouping_sets: list,
+                                   interval_option: object,
+                                   combine_cols: bool,
+                                   time_col='interval') -> list:
+        """
+        Answers a dashboard query from the warehouse. Returns the same tables as
+        process_data(selected rows, agg_cols, interval_option, combine_cols) for
+        each grouping set, with the intervals in the LGA's local time.
+
+        Args:
+            lga_name (str): Local government area.
+            cpo_selected (list): Selected charge point operators.
+            start_date (pd.Timestamp): Inclusive start of the period (tz-aware).
+            end_date (pd.Timestamp): Exclusive end of the period (tz-aware).
+            grouping_sets (list): List of aggregation column lists.
+            interval_option (object): pandas resample rule, e.g. '60min' or 'ME'.
+            combine_cols (bool): Combine the statuses into the dashboard's status groups.
+            time_col (str, optional): Name of the time column. Defaults to 'interval'.
+
+        Returns:
+            list | None: Status percentages per grouping set, or None when no rows match.
+        """
+        pivoted = self.pivot(lga_name, cpo_selected, start_date, end_date, grouping_sets, time_col)
+        if pivoted[0].empty:
+            return None
+        status_cols = [col for col in status_value_cols if col != 'evse_port_site_count']
+        if combine_cols:
+            status_cols = combined_status_cols
+        processed_data = []
+        for agg_cols, df_edit in zip(grouping_sets, pivoted):
+            df_edit = convert_dataframe_timezone(df_edit, time_col, 'state').drop(columns=['state'])
+            if combine_cols:
+                df_edit = combine_status_columns(df_edit)
+            processed_data.append(resample_status_data(df_edit, agg_cols, status_cols, interval_option, time_col))
+        return processed_data
+
+
+def open_warehouse(directory=warehouse_dir, sources=None) -> StatusWarehouse:
+    """
+    Args:
+        directory (str | Path, optional): Warehouse directory. Defaults to config.warehouse_dir.
+        sources (list, optional): Data files the warehouse must be newer than.
+            Defaults to final_processed_data next to the app.
+
+    Returns:
+        StatusWarehouse | None: The warehouse, or None when none has been built or the data has changed since.
+    """
+    directory = Path(directory)
+    files = list(directory.glob('month=*/*.parquet'))
+    if not files:
+        return None
+    sources = sources if sources is not None else [Path(__file__).parent / "final_processed_data.parquet",
+                                                   Path(__file__).parent / "final_processed_data.csv"]
+    if is_stale(files, sources):
+        print(f"Ignoring stale warehouse {directory}, rebuild it with warehouse.py")
+        return None
+    return StatusWarehouse(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the partitioned Parquet warehouse queried out of core by the dashboard.")
+    parser.add_argument("source", nargs="?", default=Path(__file__).parent / "final_processed_data.parquet",
+                        help="Long-format Parquet or CSV file, or a glob of them")
+    parser.add_argument("output_dir", nargs="?", default=warehouse_dir)
+    args = parser.parse_args()
+    print(f"Written warehouse to {build_warehouse(args.source, args.output_dir)}")